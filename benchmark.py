@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Office_Tweaks - воспроизводимый замер производительности
+
+Генерирует детерминированный синтетический корпус (изображения разных
+размеров, режимов и форматов, многостраничные PDF и DOCX, каталог с
+большим числом записей), замеряет обход каталога, сжатие изображений,
+конвертацию документов и удаление по шаблону, сохраняет результаты в JSON
+и сравнивает их с сохраненной базовой линией.
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 10
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Версия генератора: при изменении корпус создается заново
+CORPUS_VERSION = 1
+CORPUS_MANIFEST = 'corpus.json'
+DEFAULT_SEED = 1337
+
+CASES = ['list', 'compress', 'pdf_to_docx', 'docx_to_pdf', 'delete']
+
+# Размеры, режимы и форматы синтетических изображений (перебираются по кругу)
+IMAGE_SIZES = [(320, 240), (1024, 768), (1920, 1080), (4000, 3000)]
+IMAGE_VARIANTS = [('RGB', 'JPEG', 'jpg'), ('RGBA', 'PNG', 'png'), ('L', 'JPEG', 'jpg'),
+                  ('P', 'PNG', 'png'), ('RGB', 'PNG', 'png'), ('P', 'GIF', 'gif')]
+# Расширения файлов каталога для замера обхода
+LISTING_EXTENSIONS = ['txt', 'pdf', 'docx', 'jpg', 'tmp']
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud '
+         'exercitation ullamco laboris nisi aliquip ex ea commodo consequat').split()
+
+# Допустимое ухудшение относительно базовой линии, %
+DEFAULT_THRESHOLD = 10.0
+# Сравниваемые показатели: имя -> True если больше - лучше
+COMPARED_METRICS = {'files_per_second': True, 'mb_per_second': True, 'peak_rss_mb': False}
+PERCENTILES = (50, 90, 99)
+
+
+def _sentences(rng, count, words_per_sentence=12):
+    """Псевдослучайный текст из count предложений"""
+    return [' '.join(rng.choice(WORDS) for _ in range(words_per_sentence)).capitalize() + '.'
+            for _ in range(count)]
+
+
+def _synthetic_image(rng, size, mode):
+    """Изображение с градиентом, шумом и однотонными прямоугольниками
+
+    Такое содержимое сжимается заметно, но не идеально - ближе к
+    фотографиям и снимкам экрана, чем чистый шум или однотонная заливка.
+    """
+    import numpy as np
+    from PIL import Image
+
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    for channel, gradient in enumerate((x + y * 0, y + x * 0, (x + y) / 2)):
+        noise = rng.integers(-20, 21, size=(height, width), dtype=np.int16)
+        pixels[:, :, channel] = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    for _ in range(12):
+        left, top = int(rng.integers(0, width)), int(rng.integers(0, height))
+        right = min(width, left + int(rng.integers(width // 20 + 1, width // 3 + 2)))
+        bottom = min(height, top + int(rng.integers(height // 20 + 1, height // 3 + 2)))
+        pixels[top:bottom, left:right] = rng.integers(0, 256, size=3, dtype=np.uint8)
+
+    img = Image.fromarray(pixels, 'RGB')
+    if mode == 'RGBA':
+        alpha = np.broadcast_to(np.linspace(64, 255, width, dtype=np.float32)[None, :], (height, width))
+        img.putalpha(Image.fromarray(alpha.astype(np.uint8), 'L'))
+    elif mode == 'L':
+        img = img.convert('L')
+    elif mode == 'P':
+        img = img.quantize(64)
+    return img
+
+
+def _write_pdf(path, pages):
+    """Многостраничный PDF с текстом (pages - список списков строк)"""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for lines in pages:
+        text = ['BT', '/F1 11 Tf', '14 TL', '56 790 Td']
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            text.append(f'({escaped}) Tj T*')
+        text.append('ET')
+        stream = '\n'.join(text)
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    data += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    Path(path).write_bytes(bytes(data))
+
+
+def _write_docx(path, pages):
+    """Минимальный DOCX с разрывами страниц (фиксированные даты в архиве)"""
+    w = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    body = []
+    for index, lines in enumerate(pages):
+        body.extend(f'<w:p><w:r><w:t>{line}</w:t></w:r></w:p>' for line in lines)
+        if index < len(pages) - 1:
+            body.append('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+    parts = {
+        '[Content_Types].xml':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>',
+        '_rels/.rels':
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="word/document.xml"/></Relationships>',
+        'word/document.xml':
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:document xmlns:w="{w}"><w:body>{"".join(body)}</w:body></w:document>',
+    }
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts.items():
+            archive.writestr(zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), content)
+
+
+def generate_corpus(root, seed=DEFAULT_SEED, images=12, documents=6, pages=12, entries=100000):
+    """Создать корпус в root (повторно не создается, если параметры совпадают)"""
+    import numpy as np
+
+    root = Path(root)
+    params = {'version': CORPUS_VERSION, 'seed': seed, 'images': images, 'documents': documents,
+              'pages': pages, 'entries': entries}
+    manifest = root / CORPUS_MANIFEST
+    try:
+        if json.loads(manifest.read_text(encoding='utf-8'))['params'] == params:
+            return False
+    except (OSError, ValueError, KeyError):
+        pass
+    if root.exists():
+        shutil.rmtree(root)
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    text_rng = random.Random(seed)
+
+    image_dir = root / 'images'
+    image_dir.mkdir(parents=True)
+    for index in range(images):
+        size = IMAGE_SIZES[index % len(IMAGE_SIZES)]
+        mode, image_format, extension = IMAGE_VARIANTS[index % len(IMAGE_VARIANTS)]
+        img = _synthetic_image(rng, size, mode)
+        save_kwargs = {'quality': 95} if image_format == 'JPEG' else {}
+        img.save(image_dir / f'image_{index:04d}_{size[0]}x{size[1]}_{mode}.{extension}', image_format,
+                 **save_kwargs)
+
+    document_dir = root / 'documents'
+    document_dir.mkdir()
+    for index in range(documents):
+        # Объем документов растет: 1, 2, 3... x pages страниц
+        document_pages = [_sentences(text_rng, 50) for _ in range(pages * (index % 3 + 1))]
+        _write_pdf(document_dir / f'document_{index:04d}.pdf', document_pages)
+        _write_docx(document_dir / f'document_{index:04d}.docx', document_pages)
+
+    listing_dir = root / 'listing'
+    listing_dir.mkdir()
+    for index in range(entries):
+        extension = LISTING_EXTENSIONS[index % len(LISTING_EXTENSIONS)]
+        os.close(os.open(listing_dir / f'file_{index:07d}.{extension}', os.O_CREAT | os.O_WRONLY, 0o644))
+
+    manifest.write_text(json.dumps({'params': params, 'seconds': round(time.perf_counter() - started, 3)},
+                                   indent=2), encoding='utf-8')
+    return True
+
+
+def percentiles(values):
+    """Процентили (по ближайшему рангу) и максимум, секунд"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f'p{p}': round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 6) for p in PERCENTILES}
+    result['max'] = round(ordered[-1], 6)
+    result['count'] = len(ordered)
+    return result
+
+
+def peak_rss_mb():
+    """Пиковая резидентная память процесса и его дочерних процессов, МБ (None если неизвестна)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux - килобайты, macOS - байты
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        # В Linux ru_maxrss наследуется от родителя при fork, VmHWM сбрасывается при exec
+        with open('/proc/self/status', encoding='ascii') as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration, ValueError):
+        pass
+    peak = max(own, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / unit, 1)
+
+
+def _event_latencies(events_path, operation):
+    """Время этапов по событиям метрик: этап -> [секунд, ...]; (латентности, файлов с ошибкой)"""
+    stages = {}
+    failed = 0
+    with open(events_path, encoding='utf-8') as f:
+        for line in f:
+            event = json.loads(line)
+            if event['operation'] != operation:
+                continue
+            if event['status'] == 'failed':
+                failed += 1
+            for stage, seconds in event['timings'].items():
+                stages.setdefault(stage, []).append(seconds)
+    return stages, failed
+
+
+def _case_list(corpus, work_dir, repeat, jobs):
+    from file_manager import FileManager
+
+    listing_dir = corpus / 'listing'
+    file_manager = FileManager(listing_dir)
+    runs = {'all': [], 'pdf': []}
+    found = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = sum(1 for _ in file_manager.iter_file_entries(LISTING_EXTENSIONS))
+        runs['all'].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        file_manager.list_pdf_files()
+        runs['pdf'].append(time.perf_counter() - started)
+    return {'files': found, 'bytes': 0, 'runs': runs['all'], 'latency': runs}
+
+
+def _run_batch_case(corpus, work_dir, repeat, operation, run):
+    """Замер пакетной операции: run(file_manager) для каждого повтора в новом каталоге результатов"""
+    from file_manager import FileManager
+    from run_metrics import RunMetrics
+
+    runs = []
+    stages = {}
+    failed = 0
+    files = input_bytes = 0
+    for attempt in range(repeat):
+        output_dir = work_dir / f'{operation}-{attempt}'
+        events_path = work_dir / f'{operation}-{attempt}.jsonl'
+        file_manager = FileManager(corpus / ('images' if operation == 'compress_image' else 'documents'),
+                                   output_root=output_dir)
+        file_manager.metrics = RunMetrics(events_path)
+        started = time.perf_counter()
+        run(file_manager)
+        runs.append(time.perf_counter() - started)
+        file_manager.metrics.close()
+
+        summary = file_manager.metrics.summary()['operations'].get(operation, {})
+        files = sum(summary.get('files', {}).values())
+        input_bytes = summary.get('input_bytes', 0)
+        attempt_stages, attempt_failed = _event_latencies(events_path, operation)
+        failed += attempt_failed
+        for stage, values in attempt_stages.items():
+            stages.setdefault(stage, []).extend(values)
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {'files': files, 'bytes': input_bytes, 'runs': runs, 'latency': stages, 'failed': failed}
+
+
+def _case_compress(corpus, work_dir, repeat, jobs):
+    from image_processor import ImageProcessor
+
+    return _run_batch_case(corpus, work_dir, repeat, 'compress_image',
+                           lambda fm: ImageProcessor(fm).compress_all_images(quality=75, jobs=jobs))
+
+
+def _case_pdf_to_docx(corpus, work_dir, repeat, jobs):
+    import importlib.util
+    from converter import DocumentConverter
+
+    if importlib.util.find_spec('pdf2docx') is None:
+        return {'skipped': 'модуль pdf2docx не установлен'}
+    return _run_batch_case(corpus, work_dir, repeat, 'pdf_to_docx',
+                           lambda fm: DocumentConverter(fm).convert_all_pdf_to_docx(jobs=jobs))
+
+
+def _case_docx_to_pdf(corpus, work_dir, repeat, jobs):
+    import importlib.util
+    from converter import DocumentConverter
+    from file_manager import FileManager
+
+    backend = DocumentConverter(FileManager(corpus))._get_docx_backend()
+    # docx2pdf работает только через Microsoft Word (Windows, macOS)
+    if backend == 'docx2pdf' and (sys.platform not in ('win32', 'darwin')
+                                  or importlib.util.find_spec('docx2pdf') is None):
+        return {'skipped': 'нет LibreOffice (UNO) и docx2pdf с Microsoft Word'}
+    return _run_batch_case(corpus, work_dir, repeat, 'docx_to_pdf',
+                           lambda fm: DocumentConverter(fm).convert_all_docx_to_pdf(jobs=jobs))
+
+
+def _case_delete(corpus, work_dir, repeat, jobs):
+    from file_manager import FileManager
+
+    # Удаляется каждый пятый файл каталога (расширение .tmp); каталог создается заново
+    entries = json.loads((corpus / CORPUS_MANIFEST).read_text(encoding='utf-8'))['params']['entries']
+    runs = []
+    stages = {'match': [], 'delete': []}
+    deleted = 0
+    for attempt in range(repeat):
+        target = work_dir / f'delete-{attempt}'
+        target.mkdir()
+        for index in range(entries):
+            extension = LISTING_EXTENSIONS[index % len(LISTING_EXTENSIONS)]
+            os.close(os.open(target / f'file_{index:07d}.{extension}', os.O_CREAT | os.O_WRONLY, 0o644))
+
+        file_manager = FileManager(target)
+        started = time.perf_counter()
+        files = list(file_manager.iter_files_to_delete('extension', 'tmp'))
+        matched = time.perf_counter()
+        deleted = file_manager.execute_deletion(files)
+        finished = time.perf_counter()
+        stages['match'].append(matched - started)
+        stages['delete'].append(finished - matched)
+        runs.append(finished - started)
+        shutil.rmtree(target)
+    return {'files': deleted, 'bytes': 0, 'runs': runs, 'latency': stages}
+
+
+CASE_FUNCTIONS = {
+    'list': _case_list,
+    'compress': _case_compress,
+    'pdf_to_docx': _case_pdf_to_docx,
+    'docx_to_pdf': _case_docx_to_pdf,
+    'delete': _case_delete,
+}
+
+
+def run_case(name, corpus, repeat, jobs, result_path):
+    """Выполнить замер в текущем процессе и записать результат в result_path"""
+    from utils import set_quiet
+
+    set_quiet(True)
+    work_dir = Path(tempfile.mkdtemp(prefix=f'office_tweaks_bench_{name}_'))
+    try:
+        raw = CASE_FUNCTIONS[name](Path(corpus), work_dir, repeat, jobs)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if 'skipped' in raw:
+        result = raw
+    else:
+        # Пропускная способность по медиане повторов
+        seconds = sorted(raw['runs'])[len(raw['runs']) // 2]
+        result = {
+            'files': raw['files'],
+            'bytes': raw['bytes'],
+            'failed': raw.get('failed', 0),
+            'seconds': round(seconds, 6),
+            'runs': [round(run, 6) for run in raw['runs']],
+            'files_per_second': round(raw['files'] / seconds, 3) if seconds else 0.0,
+            'mb_per_second': round(raw['bytes'] / 1024 / 1024 / seconds, 3) if seconds else 0.0,
+            'peak_rss_mb': peak_rss_mb(),
+            'latency': {stage: percentiles(values) for stage, values in raw['latency'].items()},
+        }
+    Path(result_path).write_text(json.dumps(result, ensure_ascii=False), encoding='utf-8')
+
+
+def _environment():
+    """Описание окружения для сопоставимости результатов"""
+    environment = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+    try:
+        import PIL
+        environment['pillow'] = PIL.__version__
+    except ImportError:
+        environment['pillow'] = None
+    return environment
+
+
+def compare(results, baseline, threshold):
+    """Сравнение с базовой линией: (строки отчета, есть ли ухудшения)"""
+    lines = []
+    regressed = False
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous or 'skipped' in current or 'skipped' in previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            mark = ''
+            if worse > threshold:
+                mark = '  УХУДШЕНИЕ'
+                regressed = True
+            lines.append(f"  {name:12} {metric:17} {old:>12.3f} -> {new:>12.3f} ({change:+6.1f}%){mark}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Office_Tweaks - воспроизводимый замер производительности')
+    parser.add_argument('--corpus', default=os.path.join(tempfile.gettempdir(), 'office_tweaks_corpus'),
+                        help='Каталог синтетического корпуса (создается при отсутствии)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Начальное значение генератора корпуса')
+    parser.add_argument('--images', type=int, default=12, help='Число изображений в корпусе')
+    parser.add_argument('--documents', type=int, default=6, help='Число пар PDF/DOCX в корпусе')
+    parser.add_argument('--pages', type=int, default=12, help='Страниц в самом коротком документе')
+    parser.add_argument('--entries', type=int, default=100000,
+                        help='Файлов в каталоге для замера обхода и удаления')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES, help='Выполняемые замеры')
+    parser.add_argument('--repeat', type=int, default=3, help='Повторов каждого замера')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Параллельных задач в пакетных операциях')
+    parser.add_argument('-o', '--output', help='Файл результатов (JSON)')
+    parser.add_argument('--baseline', help='Результаты для сравнения (JSON)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое ухудшение относительно базовой линии, %%')
+    # Внутренний режим: выполнение одного замера в отдельном процессе
+    parser.add_argument('--run-case', choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        run_case(args.run_case, args.corpus, max(1, args.repeat), args.jobs, args.result_file)
+        return 0
+
+    from utils import print_error, print_info, print_success, print_warning
+
+    if generate_corpus(args.corpus, args.seed, args.images, args.documents, args.pages, args.entries):
+        print_info(f"Создан корпус: {args.corpus}")
+    else:
+        print_info(f"Используется готовый корпус: {args.corpus}")
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': _environment(),
+        'corpus': json.loads((Path(args.corpus) / CORPUS_MANIFEST).read_text(encoding='utf-8'))['params'],
+        'repeat': args.repeat,
+        'jobs': args.jobs,
+        'cases': {},
+    }
+
+    # Каждый замер - в отдельном процессе, чтобы пиковая память не смешивалась
+    for name in args.cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            result_path = Path(tmp) / 'result.json'
+            command = [sys.executable, os.path.abspath(__file__), '--run-case', name, '--corpus', args.corpus,
+                       '--repeat', str(args.repeat), '--jobs', str(args.jobs), '--result-file', str(result_path)]
+            completed = subprocess.run(command)
+            if completed.returncode != 0 or not result_path.exists():
+                print_error(f"{name}: замер завершился с ошибкой (код {completed.returncode})")
+                results['cases'][name] = {'skipped': f'ошибка выполнения (код {completed.returncode})'}
+                continue
+            result = json.loads(result_path.read_text(encoding='utf-8'))
+        results['cases'][name] = result
+
+        if 'skipped' in result:
+            print_warning(f"{name}: пропущен - {result['skipped']}")
+            continue
+        latency = ', '.join(f"{stage} p50 {values['p50'] * 1000:.1f} / p99 {values['p99'] * 1000:.1f} мс"
+                            for stage, values in result['latency'].items())
+        print_info(f"{name}: {result['files']} файлов за {result['seconds']:.3f} с, "
+                   f"{result['files_per_second']:.1f} файлов/с, {result['mb_per_second']:.2f} МБ/с, "
+                   f"пик памяти {result['peak_rss_mb']} МБ; {latency}")
+        if result.get('failed'):
+            print_warning(f"{name}: файлов с ошибкой: {result['failed']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+        print_success(f"Результаты сохранены: {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        lines, regressed = compare(results, baseline, args.threshold)
+        print_info(f"Сравнение с {args.baseline} (порог {args.threshold}%):")
+        print('\n'.join(lines) if lines else "  Нет общих замеров")
+        if regressed:
+            print_error("Обнаружено ухудшение производительности")
+            return 1
+        print_success("Ухудшений не обнаружено")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import argparse
+import re
+
+# Допустимые значения параметров. Объявлены здесь, а не в модулях операций,
+# чтобы разбор аргументов не загружал эти модули
+
+# Политика выходного формата (--format): keep - формат исходного файла,
+# auto - наименьший результат среди исходного формата, JPEG, WebP и AVIF
+OUTPUT_FORMATS = ['keep', 'auto', 'jpeg', 'webp', 'avif']
+
+# Фильтры масштабирования (имена для --resample)
+RESAMPLE_FILTERS = ['nearest', 'box', 'bilinear', 'hamming', 'bicubic', 'lanczos']
+
+# Обработка похожих изображений (--dedup): report - сжимается только представитель
+# группы, link - остальным копиям дается ссылка на его результат
+DEDUP_MODES = ['report', 'link']
+
+# Критерии удаления файлов (сравнение имени без учета регистра)
+DELETE_MODES = ['startswith', 'endswith', 'contains', 'extension', 'glob', 'regex']
+
+# Действия с найденными дубликатами файлов (--dup-action)
+DUPLICATE_ACTIONS = ['report', 'delete', 'link']
+
+# Режимы профилирования (--profile)
+PROFILE_MODES = ['cpu', 'sample', 'mem']
+
+
+def parse_size(value):
+    """Размер в байтах из строки вида 500000, 300K, 2M"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B')
+    multiplier = units.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    try:
+        size = int(float(value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Некорректный размер: {value}")
+    if size <= 0:
+        raise argparse.ArgumentTypeError("Размер должен быть больше 0")
+    return size
+
+
+class CLIParser:
+    def __init__(self):
+        self.parser = self._create_parser()
+
+    def _create_parser(self):
+        """Создание парсера аргументов командной строки"""
+        parser = argparse.ArgumentParser(
+            prog='office_tweaks',
+            description='Office_Tweaks - Утилита для работы с документами и изображениями',
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+            epilog=(
+                "Примеры:\n"
+                "  office_tweaks --pdf2docx all --workdir ./docs --jobs 4\n"
+                "  office_tweaks --docx2pdf report.docx --output report.pdf\n"
+                "  office_tweaks --compress-images all --quality 70\n"
+                "  office_tweaks --compress-images all --target-size 300K --jobs 0\n"
+                "  office_tweaks --compress-images all --format auto --max-width 1920\n"
+                "  office_tweaks --pdf2docx all --recursive --output-dir ./converted\n"
+                "  office_tweaks --delete --delete-mode extension --delete-pattern tmp\n"
+                "  office_tweaks --delete --delete-mode glob --delete-pattern '*.log' -r --older-than 30 --yes\n"
+                "  office_tweaks --delete --delete-pattern tmp --quarantine\n"
+                "  office_tweaks --undo 20240101-120000-a1b2c3\n"
+                "  office_tweaks --find-duplicates -r --dup-action link --min-size 1M\n"
+                "  office_tweaks --compress-images all -q --metrics-log metrics.jsonl --report report.json\n"
+                "\nБез аргументов запускается интерактивное меню."
+            )
+        )
+
+        parser.add_argument('-w', '--workdir', help='Рабочий каталог')
+        parser.add_argument('-o', '--output', help='Путь к выходному файлу (для одного файла)')
+        parser.add_argument('-r', '--recursive', action='store_true',
+                            help="Обрабатывать файлы в подкаталогах (для операций 'all')")
+        parser.add_argument('--output-dir',
+                            help='Каталог результатов (структура подкаталогов сохраняется)')
+
+        operations = parser.add_mutually_exclusive_group()
+        operations.add_argument('--pdf2docx', metavar='FILE|all',
+                                help="Конвертировать PDF в DOCX ('all' - все файлы каталога)")
+        operations.add_argument('--docx2pdf', metavar='FILE|all',
+                                help="Конвертировать DOCX в PDF ('all' - все файлы каталога)")
+        operations.add_argument('--compress-images', metavar='FILE|all',
+                                help="Сжать изображения ('all' - все файлы каталога)")
+        operations.add_argument('--delete', action='store_true',
+                                help='Удалить группу файлов по шаблону')
+        operations.add_argument('--undo', metavar='BATCH',
+                                help='Восстановить файлы пакета карантина (карантин каталога --delete-dir '
+                                     'или рабочего)')
+        operations.add_argument('--purge-quarantine', action='store_true',
+                                help='Удалить пакеты карантина старше --retention-days дней')
+        operations.add_argument('--find-duplicates', action='store_true',
+                                help='Найти файлы с одинаковым содержимым (опись каталога сохраняется между запусками)')
+
+        parser.add_argument('--quality', type=int, default=85,
+                            help='Качество сжатия изображений 1-100 (по умолчанию 85)')
+        parser.add_argument('--format', dest='output_format', default='keep', choices=OUTPUT_FORMATS,
+                            help='Формат сжатых изображений (по умолчанию keep - исходный; '
+                                 'auto - наименьший из исходного, JPEG, WebP и AVIF)')
+        parser.add_argument('--min-savings', type=float, default=0.0, metavar='PERCENT',
+                            help='Записывать сжатое изображение, только если оно меньше исходного '
+                                 'хотя бы на PERCENT %% (по умолчанию 0 - просто меньше)')
+        parser.add_argument('--in-place', action='store_true',
+                            help='Заменять исходные изображения сжатыми вместо создания compressed_ копий')
+        parser.add_argument('--max-width', type=int, metavar='PX',
+                            help='Уменьшить изображения шире PX пикселей (с сохранением пропорций)')
+        parser.add_argument('--max-height', type=int, metavar='PX',
+                            help='Уменьшить изображения выше PX пикселей (с сохранением пропорций)')
+        parser.add_argument('--resample', default='lanczos', choices=RESAMPLE_FILTERS,
+                            help='Фильтр масштабирования изображений (по умолчанию lanczos)')
+        parser.add_argument('--adaptive-quality', type=int, metavar='MIN_QUALITY', dest='adaptive_min_quality',
+                            help='Подбирать качество по сложности изображения: от MIN_QUALITY для однотонных '
+                                 'до --quality для детализированных')
+        parser.add_argument('--dedup', choices=DEDUP_MODES,
+                            help='Искать похожие изображения и сжимать одно на группу '
+                                 '(report - только отчет, link - ссылки на результат для копий)')
+        parser.add_argument('--dedup-distance', type=int, default=6, metavar='BITS',
+                            help='Максимальное различие перцептивных хэшей похожих изображений (0-64, по умолчанию 6)')
+        parser.add_argument('--target-size', type=parse_size, metavar='SIZE',
+                            help='Подобрать качество JPEG/WebP так, чтобы файл был не больше SIZE (например 300K)')
+        parser.add_argument('--min-similarity', type=float, metavar='SSIM',
+                            help='Подобрать наименьшее качество JPEG/WebP со сходством не ниже SSIM (0-1, например 0.95)')
+        parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='Количество параллельных процессов (0 - по числу ядер, по умолчанию 1)')
+
+        parser.add_argument('--watch', action='store_true',
+                            help="Следить за каталогом и обрабатывать новые файлы (вместе с операцией 'all')")
+        parser.add_argument('--settle-time', type=float, default=2.0,
+                            help='Сколько секунд файл не должен меняться перед обработкой (по умолчанию 2)')
+
+        parser.add_argument('--resume', metavar='JOB_ID',
+                            help="Продолжить прерванное пакетное задание (вместе с той же операцией 'all')")
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Не использовать кэш результатов (обработать все файлы заново)')
+        parser.add_argument('-q', '--quiet', action='store_true',
+                            help='Не выводить информационные сообщения и прогресс (только ошибки)')
+        parser.add_argument('--metrics-log', metavar='FILE',
+                            help='Дописывать в FILE события по каждому файлу (JSON строки)')
+        parser.add_argument('--report', metavar='FILE',
+                            help='Записать итоги запуска в FILE (JSON)')
+        parser.add_argument('--prometheus', metavar='FILE',
+                            help='Записать итоги запуска в FILE в формате Prometheus (textfile collector)')
+        parser.add_argument('--profile', choices=PROFILE_MODES,
+                            help='Профилирование: cpu - cProfile (.pstats), sample - выборка стеков '
+                                 '(.collapsed для flamegraph), mem - tracemalloc (память по файлам); '
+                                 'профилируется главный процесс, используйте с --jobs 1')
+        parser.add_argument('--profile-output', default='office_tweaks_profile', metavar='PREFIX',
+                            help='Префикс файлов результатов профилирования (по умолчанию office_tweaks_profile)')
+
+        parser.add_argument('--large-pdf-pages', type=int, default=200,
+                            help='Порог страниц, выше которого PDF конвертируется частями (0 - отключить)')
+        parser.add_argument('--shard-pages', type=int, default=50,
+                            help='Количество страниц в одной части большого PDF (по умолчанию 50)')
+
+        parser.add_argument('--docx-backend', default='auto', choices=['auto', 'docx2pdf', 'libreoffice'],
+                            help='Механизм конвертации DOCX -> PDF (по умолчанию auto: LibreOffice вне Windows)')
+        parser.add_argument('--office-workers', type=int, default=2,
+                            help='Количество экземпляров LibreOffice в пуле (по умолчанию 2)')
+
+        parser.add_argument('--delete-mode', default='extension',
+                            choices=DELETE_MODES,
+                            help='Критерий удаления (по умолчанию extension); glob - шаблон вида *.tmp, '
+                                 'regex - регулярное выражение для имени файла')
+        parser.add_argument('--delete-pattern', help='Шаблон для удаления')
+        parser.add_argument('--delete-dir', help='Каталог для удаления (по умолчанию рабочий)')
+        parser.add_argument('--older-than', type=float, metavar='DAYS',
+                            help='Удалять только файлы, измененные более DAYS дней назад')
+        parser.add_argument('--min-size', type=parse_size, metavar='SIZE',
+                            help='Учитывать только файлы не меньше SIZE байт (для --delete и --find-duplicates; '
+                                 'допускаются суффиксы K, M, G)')
+        parser.add_argument('--max-size', type=parse_size, metavar='SIZE',
+                            help='Удалять только файлы не больше SIZE байт (допускаются суффиксы K, M, G)')
+        parser.add_argument('-y', '--yes', action='store_true',
+                            help='Удалять без списка файлов и подтверждения')
+        parser.add_argument('--quarantine', action='store_true',
+                            help='Переносить файлы в карантин (каталог .office_tweaks_quarantine '
+                                 'в каталоге удаления) вместо удаления; восстановление - --undo')
+        parser.add_argument('--dup-action', default='report', choices=DUPLICATE_ACTIONS,
+                            help='Действие с найденными копиями: report - список, delete - удалить, '
+                                 'link - заменить жесткими ссылками (по умолчанию report)')
+        parser.add_argument('--retention-days', type=float, default=30,
+                            help='Срок хранения пакетов карантина в днях (по умолчанию 30)')
+
+        return parser
+
+    def parse_args(self, argv=None):
+        """Разбор и проверка аргументов"""
+        args = self.parser.parse_args(argv)
+
+        if not 1 <= args.quality <= 100:
+            self.parser.error("Качество должно быть в диапазоне от 1 до 100")
+        if args.adaptive_min_quality is not None and not 1 <= args.adaptive_min_quality <= 100:
+            self.parser.error("Минимальное качество должно быть в диапазоне от 1 до 100")
+        if args.min_similarity is not None and not 0 < args.min_similarity <= 1:
+            self.parser.error("Сходство должно быть в диапазоне от 0 до 1")
+        if (args.max_width is not None and args.max_width < 1) or (args.max_height is not None and args.max_height < 1):
+            self.parser.error("Максимальный размер изображения должен быть не меньше 1 пикселя")
+        if not 0 <= args.min_savings < 100:
+            self.parser.error("Минимальная экономия должна быть в диапазоне от 0 до 100")
+        if not 0 <= args.dedup_distance <= 64:
+            self.parser.error("Различие хэшей должно быть в диапазоне от 0 до 64")
+        if args.jobs < 0:
+            self.parser.error("Количество процессов не может быть отрицательным")
+        if args.large_pdf_pages < 0:
+            self.parser.error("Порог страниц не может быть отрицательным")
+        if args.shard_pages < 1:
+            self.parser.error("Размер части должен быть не меньше 1 страницы")
+        if args.office_workers < 1:
+            self.parser.error("Количество экземпляров LibreOffice должно быть не меньше 1")
+        if args.watch:
+            operation = args.pdf2docx or args.docx2pdf or args.compress_images
+            if not operation or operation.lower() != 'all':
+                self.parser.error("--watch используется с --pdf2docx all, --docx2pdf all или --compress-images all")
+        if args.resume:
+            operation = args.pdf2docx or args.docx2pdf or args.compress_images
+            if not operation or operation.lower() != 'all':
+                self.parser.error("--resume используется с --pdf2docx all, --docx2pdf all или --compress-images all")
+        if args.delete and not args.delete_pattern:
+            self.parser.error("Для --delete необходимо указать --delete-pattern")
+        if args.delete and args.delete_mode == 'regex':
+            try:
+                re.compile(args.delete_pattern)
+            except re.error as e:
+                self.parser.error(f"Некорректное регулярное выражение: {e}")
+        if args.retention_days < 0:
+            self.parser.error("Срок хранения карантина не может быть отрицательным")
+        if args.older_than is not None and args.older_than < 0:
+            self.parser.error("Возраст файла не может быть отрицательным")
+        if args.min_size is not None and args.max_size is not None and args.min_size > args.max_size:
+            self.parser.error("--min-size не может быть больше --max-size")
+
+        return args
+
+    def get_operation_mode(self, args):
+        """Определение режима работы: interactive или batch"""
+        if args.pdf2docx or args.docx2pdf or args.compress_images or args.delete \
+                or args.undo or args.purge_quarantine or args.find_duplicates:
+            return 'batch'
+        return 'interactive'
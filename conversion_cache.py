@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+CACHE_FILENAME = '.office_tweaks_cache.db'
+
+
+class ConversionCache:
+    """Кэш результатов обработки, привязанный к содержимому входных файлов
+
+    Ключ записи - путь входного файла, операция и её параметры; запись
+    действительна, пока совпадает SHA-256 содержимого файла и результат на
+    месте. Хэши запоминаются по (путь, размер, mtime), поэтому неизменённые
+    файлы повторно не читаются.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.db_path = self.directory / CACHE_FILENAME
+        self.connection = sqlite3.connect(str(self.db_path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._pending_writes = 0
+
+    def _create_tables(self):
+        """Создание таблиц кэша"""
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(outputs)")]
+        if columns and 'source_path' not in columns:
+            # Записи прежнего формата не привязаны к входному файлу
+            self.connection.execute("DROP TABLE outputs")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS outputs (
+                source_path TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                params TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                output_path TEXT NOT NULL,
+                output_size INTEGER NOT NULL,
+                output_mtime_ns INTEGER NOT NULL,
+                PRIMARY KEY (source_path, operation, params)
+            );
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                dhash TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL
+            );
+        """)
+
+    def _write(self, sql, values):
+        """Запись с отложенной фиксацией транзакции"""
+        self.connection.execute(sql, values)
+        self._pending_writes += 1
+        if self._pending_writes >= 100:
+            self.commit()
+
+    def commit(self):
+        """Зафиксировать накопленные изменения"""
+        self.connection.commit()
+        self._pending_writes = 0
+
+    def close(self):
+        """Закрыть базу кэша"""
+        self.commit()
+        self.connection.close()
+
+    def file_hash(self, path):
+        """SHA-256 содержимого файла (пересчитывается только при изменении файла)"""
+        path = Path(path).resolve()
+        stat_result = path.stat()
+        row = self.connection.execute(
+            "SELECT sha256 FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (str(path), stat_result.st_size, stat_result.st_mtime_ns)
+        ).fetchone()
+        if row:
+            return row[0]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        self._write(
+            "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (str(path), stat_result.st_size, stat_result.st_mtime_ns, content_hash)
+        )
+        return content_hash
+
+    def get_image_hash(self, path, stat_result):
+        """Перцептивный хэш изображения (хэш, ширина, высота) или None, если файл изменился"""
+        row = self.connection.execute(
+            "SELECT dhash, width, height FROM image_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (str(Path(path).resolve()), stat_result.st_size, stat_result.st_mtime_ns)
+        ).fetchone()
+        if not row:
+            return None
+        return int(row[0], 16), row[1], row[2]
+
+    def store_image_hash(self, path, stat_result, value):
+        """Запомнить перцептивный хэш изображения"""
+        image_hash, width, height = value
+        self._write(
+            "INSERT OR REPLACE INTO image_hashes (path, size, mtime_ns, dhash, width, height) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (str(Path(path).resolve()), stat_result.st_size, stat_result.st_mtime_ns,
+             f"{image_hash:016x}", width, height)
+        )
+
+    @staticmethod
+    def _params_key(params):
+        """Каноническое представление параметров операции"""
+        return json.dumps(params or {}, sort_keys=True)
+
+    def lookup(self, source, operation, params=None, output_dir=None):
+        """Найти актуальный результат обработки файла (None если его нет)
+
+        output_dir - каталог, в котором должен лежать результат: результат
+        в другом каталоге (например, при смене --output-dir) не подходит.
+        """
+        source = Path(source).resolve()
+        row = self.connection.execute(
+            "SELECT content_hash, output_path, output_size, output_mtime_ns FROM outputs "
+            "WHERE source_path = ? AND operation = ? AND params = ?",
+            (str(source), operation, self._params_key(params))
+        ).fetchone()
+        if not row:
+            return None
+
+        content_hash, output_path, output_size, output_mtime_ns = row
+        if output_dir is not None and Path(output_path).parent != Path(output_dir).resolve():
+            return None
+        try:
+            # Входной файл изменился после обработки
+            if self.file_hash(source) != content_hash:
+                return None
+        except OSError:
+            return None
+
+        try:
+            stat_result = os.stat(output_path)
+        except OSError:
+            return None
+
+        # Результат удалён или изменён после обработки - считаем его устаревшим
+        if stat_result.st_size != output_size or stat_result.st_mtime_ns != output_mtime_ns:
+            return None
+        return Path(output_path)
+
+    def store(self, source, operation, params, output_path):
+        """Запомнить результат обработки файла (сам входной файл результатом не считается)"""
+        try:
+            output_path = Path(output_path).resolve()
+            if output_path == Path(source).resolve():
+                return
+            stat_result = output_path.stat()
+            self._write(
+                "INSERT OR REPLACE INTO outputs "
+                "(source_path, operation, params, content_hash, output_path, output_size, output_mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(Path(source).resolve()), operation, self._params_key(params), self.file_hash(source),
+                 str(output_path), stat_result.st_size, stat_result.st_mtime_ns)
+            )
+        except OSError:
+            pass
+
+    def known_outputs(self, operation):
+        """Записанные результаты операции: путь -> (размер, mtime_ns) на момент записи
+
+        Записи, в которых результатом указан сам входной файл (так сохранялись
+        файлы без выигрыша от сжатия), пропускаются.
+        """
+        return {output_path: (output_size, output_mtime_ns) for output_path, output_size, output_mtime_ns in
+                self.connection.execute(
+                    "SELECT output_path, output_size, output_mtime_ns FROM outputs o WHERE operation = ? "
+                    "AND NOT EXISTS (SELECT 1 FROM file_hashes h WHERE h.path = o.output_path "
+                    "AND h.size = o.output_size AND h.mtime_ns = o.output_mtime_ns AND h.sha256 = o.content_hash)",
+                    (operation,))}
+
+    def split_cached(self, files, operation, params=None, output_dir=None):
+        """Разделить файлы на требующие обработки и число попаданий в кэш
+
+        output_dir - функция: входной файл -> каталог, где должен лежать результат.
+        """
+        pending = []
+        hits = 0
+        for source in files:
+            if self.lookup(source, operation, params, output_dir(source) if output_dir else None):
+                hits += 1
+            else:
+                pending.append(source)
+        return pending, hits
@@ -1,14 +1,160 @@
 import os
+import time
 from pathlib import Path
-from utils import print_success, print_error, print_info, show_progress, print_summary
+from profiling import profiled
+from utils import print_success, print_error, print_warning, print_info, Progress, print_summary, \
+    resolve_jobs, iter_parallel, atomic_output
+
+
+def _convert_worker(task):
+    """Конвертация одного файла в дочернем процессе пула"""
+    from file_manager import FileManager
+
+    method_name, source, output_path, options = task
+    converter = DocumentConverter(FileManager(Path(source).parent), **options)
+    return _timed_convert(converter, method_name, source, output_path)
+
+
+def _timed_convert(converter, method_name, source, output_path):
+    """Конвертация в занятый заранее output_path: (успех, секунды, текст ошибки)"""
+    started = time.perf_counter()
+    result = getattr(converter, method_name)(source, output_path, claimed=True)
+    return result, time.perf_counter() - started, converter.errors.pop(str(Path(source)), None)
+
+
+def _convert_pdf_shard(task):
+    """Конвертация диапазона страниц PDF в отдельный DOCX (в дочернем процессе)"""
+    from pdf2docx import Converter
+
+    pdf_path, start, end, shard_path = task
+    try:
+        cv = Converter(pdf_path)
+        try:
+            cv.convert(shard_path, pages=list(range(start, end)))
+        finally:
+            cv.close()
+        return True
+    except Exception as e:
+        print_error(f"Ошибка конвертации страниц {start + 1}-{end}: {str(e)}")
+        return False
+
+
+def _merge_docx_shards(shard_paths, output_path):
+    """Объединение DOCX-частей в один документ
+
+    Части открываются по одной, но итоговый документ (вместе с изображениями)
+    накапливается в памяти целиком: память растет с размером результата.
+    Ограничена только память разбора PDF - каждая часть конвертируется
+    отдельным вызовом pdf2docx. Изображения и внешние ссылки перепривязываются
+    к итоговому документу.
+    """
+    from copy import deepcopy
+    from io import BytesIO
+    from docx import Document
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    master = Document(shard_paths[0])
+    body = master.element.body
+
+    for shard_path in shard_paths[1:]:
+        shard = Document(shard_path)
+        shard_body = shard.element.body
+
+        # Последняя секция предыдущей части становится разрывом раздела
+        section_break = OxmlElement('w:p')
+        paragraph_props = OxmlElement('w:pPr')
+        paragraph_props.append(deepcopy(body.sectPr))
+        section_break.append(paragraph_props)
+        body.sectPr.addprevious(section_break)
+
+        for element in shard_body.iterchildren():
+            if element.tag == qn('w:sectPr'):
+                continue
+
+            for blip in element.xpath('.//a:blip[@r:embed]'):
+                image_part = shard.part.related_parts[blip.get(qn('r:embed'))]
+                rel_id, _ = master.part.get_or_add_image(BytesIO(image_part.blob))
+                blip.set(qn('r:embed'), rel_id)
+
+            for link in element.xpath('.//w:hyperlink[@r:id]'):
+                rel = shard.part.rels[link.get(qn('r:id'))]
+                if rel.is_external:
+                    link.set(qn('r:id'), master.part.relate_to(rel.target_ref, rel.reltype, is_external=True))
+
+            body.sectPr.addprevious(deepcopy(element))
+
+        body.sectPr.getparent().replace(body.sectPr, deepcopy(shard_body.sectPr))
+
+    master.save(str(output_path))
 
 
 class DocumentConverter:
-    def __init__(self, file_manager):
+    def __init__(self, file_manager, large_pdf_pages=200, shard_pages=50, shard_jobs=0,
+                 docx_backend='auto', office_workers=2):
         self.file_manager = file_manager
+        # PDF с числом страниц больше порога конвертируется частями (0 - отключено)
+        self.large_pdf_pages = large_pdf_pages
+        self.shard_pages = max(1, shard_pages)
+        self.shard_jobs = shard_jobs
+        # DOCX -> PDF: 'docx2pdf' (Microsoft Word), 'libreoffice' (пул soffice) или 'auto'
+        self.docx_backend = docx_backend
+        self.office_workers = office_workers
+        self._resolved_docx_backend = None
+        self._libreoffice_pool = None
+        # Текст последней ошибки конвертации по исходному файлу
+        self.errors = {}
+
+    def _worker_options(self):
+        """Параметры конвертера для дочерних процессов пакетного режима"""
+        # Файлы уже распределены по процессам, части обрабатываются последовательно
+        return {
+            'large_pdf_pages': self.large_pdf_pages,
+            'shard_pages': self.shard_pages,
+            'shard_jobs': 1,
+            'docx_backend': self.docx_backend,
+        }
+
+    def _get_pdf_page_count(self, pdf_path):
+        """Количество страниц PDF (0 если определить не удалось)"""
+        try:
+            import fitz
+            with fitz.open(str(pdf_path)) as doc:
+                return doc.page_count
+        except Exception:
+            return 0
+
+    def _pdf_to_docx_sharded(self, pdf_path, output_path, page_count):
+        """Конвертация большого PDF частями в параллельных процессах (RuntimeError при ошибке)"""
+        import tempfile
+
+        ranges = [(start, min(start + self.shard_pages, page_count))
+                  for start in range(0, page_count, self.shard_pages)]
+        jobs = min(resolve_jobs(self.shard_jobs), len(ranges))
+        print_info(f"Большой документ: {page_count} стр., частей: {len(ranges)}, процессов: {jobs}")
+
+        with tempfile.TemporaryDirectory(prefix='.office_tweaks_', dir=output_path.parent) as tmp_dir:
+            tasks = [(str(pdf_path), start, end, str(Path(tmp_dir) / f"shard_{i:05d}.docx"))
+                     for i, (start, end) in enumerate(ranges)]
 
-    def pdf_to_docx(self, pdf_path, output_path=None):
-        """Конвертация PDF в DOCX"""
+            if jobs > 1:
+                results = dict(iter_parallel(_convert_pdf_shard, tasks, jobs))
+            else:
+                results = {task: _convert_pdf_shard(task) for task in tasks}
+
+            if not all(results.get(task) for task in tasks):
+                raise RuntimeError(f"не удалось сконвертировать часть страниц: {pdf_path.name}")
+
+            _merge_docx_shards([task[3] for task in tasks], output_path)
+
+    @profiled('pdf_to_docx', per_file=True)
+    def pdf_to_docx(self, pdf_path, output_path=None, claimed=False):
+        """Конвертация PDF в DOCX
+
+        claimed - имя output_path уже занято вызывающим кодом
+        (FileManager.get_unique_filename с claim=True).
+        """
+        claimed_path = None
         try:
             from pdf2docx import Converter
 
@@ -22,33 +168,70 @@ class DocumentConverter:
             else:
                 output_path = Path(output_path)
 
-            # Проверка существования выходного файла
-            if output_path.exists():
-                output_path = self.file_manager.get_unique_filename(output_path)
+            # Выходное имя занимается сразу, чтобы его не выбрал параллельный процесс
+            if not claimed:
+                output_path = claimed_path = self.file_manager.get_unique_filename(output_path, claim=True)
 
             print_info(f"Конвертация: {pdf_path.name} -> {output_path.name}")
 
             # Конвертация
-            cv = Converter(str(pdf_path))
-            cv.convert(str(output_path))
-            cv.close()
+            page_count = self._get_pdf_page_count(pdf_path) if self.large_pdf_pages else 0
+            with atomic_output(output_path) as tmp_path:
+                if page_count > self.large_pdf_pages:
+                    self._pdf_to_docx_sharded(pdf_path, tmp_path, page_count)
+                else:
+                    cv = Converter(str(pdf_path))
+                    cv.convert(str(tmp_path))
+                    cv.close()
 
             print_success(f"Конвертация завершена: {output_path.name}")
             return True
 
         except ImportError:
+            self.errors[str(Path(pdf_path))] = "pdf2docx не установлен"
             print_error("Библиотека pdf2docx не установлена")
             print_info("Установите: pip install pdf2docx")
             return False
         except Exception as e:
             print_error(f"Ошибка конвертации PDF в DOCX: {str(e)}")
+            self.errors[str(pdf_path)] = str(e)
             return False
+        finally:
+            # Метка имени снимается при любом исходе (результат уже на месте или его нет)
+            self.file_manager.release_filename(claimed_path)
 
-    def docx_to_pdf(self, docx_path, output_path=None):
-        """Конвертация DOCX в PDF"""
-        try:
-            from docx2pdf import convert
+    def _get_docx_backend(self):
+        """Выбор механизма конвертации DOCX -> PDF"""
+        if self._resolved_docx_backend is None:
+            backend = self.docx_backend
+            if backend == 'auto':
+                from libreoffice_pool import libreoffice_available
+                # На Windows docx2pdf работает через установленный Word
+                backend = 'libreoffice' if os.name != 'nt' and libreoffice_available() else 'docx2pdf'
+            self._resolved_docx_backend = backend
+        return self._resolved_docx_backend
 
+    def _get_libreoffice_pool(self):
+        """Пул экземпляров LibreOffice (None если используется docx2pdf)"""
+        if self._libreoffice_pool is None and self._get_docx_backend() == 'libreoffice':
+            try:
+                from libreoffice_pool import LibreOfficePool
+                self._libreoffice_pool = LibreOfficePool(self.office_workers)
+            except (ImportError, RuntimeError) as e:
+                print_warning(f"LibreOffice недоступен ({str(e)}), используется docx2pdf")
+                self._resolved_docx_backend = 'docx2pdf'
+        return self._libreoffice_pool
+
+    @profiled('docx_to_pdf', per_file=True)
+    def docx_to_pdf(self, docx_path, output_path=None, claimed=False):
+        """Конвертация DOCX в PDF
+
+        claimed - имя output_path уже занято вызывающим кодом
+        (FileManager.get_unique_filename с claim=True).
+        """
+        pool = None
+        claimed_path = None
+        try:
             docx_path = Path(docx_path)
             if not docx_path.exists():
                 print_error(f"Файл не найден: {docx_path}")
@@ -59,74 +242,168 @@ class DocumentConverter:
             else:
                 output_path = Path(output_path)
 
-            # Проверка существования выходного файла
-            if output_path.exists():
-                output_path = self.file_manager.get_unique_filename(output_path)
+            # Выходное имя занимается сразу, чтобы его не выбрал параллельный процесс
+            if not claimed:
+                output_path = claimed_path = self.file_manager.get_unique_filename(output_path, claim=True)
 
+            pool = self._get_libreoffice_pool()
             print_info(f"Конвертация: {docx_path.name} -> {output_path.name}")
 
             # Конвертация
-            convert(str(docx_path), str(output_path))
+            with atomic_output(output_path) as tmp_path:
+                if pool is not None:
+                    pool.convert(docx_path, tmp_path)
+                else:
+                    from docx2pdf import convert
+                    convert(str(docx_path), str(tmp_path))
 
             print_success(f"Конвертация завершена: {output_path.name}")
             return True
 
         except ImportError:
+            self.errors[str(docx_path)] = "docx2pdf не установлен"
             print_error("Библиотека docx2pdf не установлена")
             print_info("Установите: pip install docx2pdf")
             print_info("Примечание: для работы требуется установленный Microsoft Word")
             return False
         except Exception as e:
             print_error(f"Ошибка конвертации DOCX в PDF: {str(e)}")
-            print_info("Убедитесь, что Microsoft Word установлен и доступен")
+            self.errors[str(docx_path)] = str(e)
+            if pool is None:
+                print_info("Убедитесь, что Microsoft Word установлен и доступен")
             return False
+        finally:
+            self.file_manager.release_filename(claimed_path)
+
+    def _convert_batch(self, files, method_name, suffix, description, jobs=1):
+        """Пакетная конвертация списка файлов (последовательно или в пуле процессов)"""
+        journal, files = self.file_manager.start_job(method_name, None, files)
+        try:
+            return self._run_batch(files, method_name, suffix, description, jobs, journal)
+        finally:
+            self.file_manager.finish_job()
+
+    @profiled('convert_batch')
+    def _run_batch(self, files, method_name, suffix, description, jobs, journal):
+        """Конвертация файлов пакета с отметкой результатов в журнале задания"""
+        from job_journal import STATE_DONE, STATE_FAILED
+
+        total = len(files)
+        cache = self.file_manager.get_cache()
 
-    def convert_all_pdf_to_docx(self, directory=None):
-        """Конвертация всех PDF файлов в DOCX"""
+        # Файлы, результат конвертации которых уже есть и не изменился, пропускаются
+        cache_hits = 0
+        if cache:
+            pending, cache_hits = cache.split_cached(
+                files, method_name, output_dir=lambda f: self.file_manager.get_output_path(f, suffix).parent)
+            if cache_hits:
+                print_info(f"Без изменений (пропущено по кэшу): {cache_hits}")
+            for source in set(files).difference(pending):
+                if journal:
+                    journal.record(source, STATE_DONE)
+                self._record_metrics(method_name, source, 'cached')
+            files = pending
+
+        # Имена выходных файлов занимаются заранее в главном процессе,
+        # чтобы параллельные процессы не выбрали одно и то же имя
+        tasks = []
+        for source in files:
+            output_path = self.file_manager.get_unique_filename(
+                self.file_manager.get_output_path(source, suffix), claim=True)
+            tasks.append((method_name, str(source), str(output_path), self._worker_options()))
+
+        success_count = cache_hits
+        jobs = min(resolve_jobs(jobs), len(tasks))
+
+        if method_name == 'docx_to_pdf' and tasks and self._get_libreoffice_pool() is not None:
+            # Пул LibreOffice живет в главном процессе, файлы раздаются потокам
+            jobs = min(self.office_workers, len(tasks))
+            print_info(f"Конвертация через LibreOffice: {jobs} экземпляров")
+            results = iter_parallel(lambda task: _timed_convert(self, method_name, task[1], task[2]), tasks, jobs,
+                                    use_threads=True)
+        elif jobs > 1:
+            print_info(f"Параллельная обработка: {jobs} процессов")
+            results = iter_parallel(_convert_worker, tasks, jobs)
+        else:
+            results = ((task, _timed_convert(self, method_name, task[1], task[2])) for task in tasks)
+
+        try:
+            with Progress(total, description, initial=cache_hits) as progress:
+                for task, outcome in results:
+                    result, seconds, error = outcome or (False, 0.0, None)
+                    try:
+                        progress.update(nbytes=os.path.getsize(task[1]))
+                    except OSError:
+                        progress.update()
+                    if result:
+                        success_count += 1
+                        if cache:
+                            cache.store(task[1], method_name, None, task[2])
+                    if journal:
+                        journal.record(task[1], STATE_DONE if result else STATE_FAILED)
+                    self._record_metrics(method_name, task[1], 'ok' if result else 'failed',
+                                         task[2] if result else None, seconds, error)
+        finally:
+            # Метки занятых имен всех файлов пакета
+            for task in tasks:
+                self.file_manager.release_filename(task[2])
+
+        if cache:
+            cache.commit()
+
+        print_summary(success_count, total, cache_hits=cache_hits)
+        return success_count, total
+
+    def _record_metrics(self, method_name, source, status, output_path=None, seconds=None, error=None):
+        """Событие конвертации файла в метриках запуска (если они собираются)"""
+        metrics = self.file_manager.metrics
+        if metrics is None:
+            return
+        from run_metrics import file_size
+
+        backend = 'pdf2docx' if method_name == 'pdf_to_docx' else self._resolved_docx_backend or self.docx_backend
+        timings = {'convert': seconds, 'total': seconds} if seconds is not None else None
+        metrics.record(method_name, source, status, output=output_path, input_bytes=file_size(source),
+                       output_bytes=file_size(output_path), timings=timings, backend=backend, error=error)
+
+    def convert_all_pdf_to_docx(self, directory=None, jobs=1, files=None):
+        """Конвертация всех PDF файлов в DOCX (или только файлов из списка files)"""
         if directory:
             self.file_manager.change_directory(directory)
 
-        pdf_files = self.file_manager.list_pdf_files()
+        pdf_files = files if files is not None else self.file_manager.list_pdf_files(sort=False)
         if not pdf_files:
             print_info("PDF файлы не найдены в текущем каталоге")
             return 0, 0
 
         print_info(f"Найдено PDF файлов: {len(pdf_files)}")
-        success_count = 0
-
-        for i, pdf_file in enumerate(pdf_files, 1):
-            show_progress(i, len(pdf_files), "Конвертация PDF -> DOCX")
-            if self.pdf_to_docx(pdf_file):
-                success_count += 1
+        return self._convert_batch(pdf_files, 'pdf_to_docx', '.docx', "Конвертация PDF -> DOCX", jobs)
 
-        print_summary(success_count, len(pdf_files))
-        return success_count, len(pdf_files)
-
-    def convert_all_docx_to_pdf(self, directory=None):
-        """Конвертация всех DOCX файлов в PDF"""
+    def convert_all_docx_to_pdf(self, directory=None, jobs=1, files=None):
+        """Конвертация всех DOCX файлов в PDF (или только файлов из списка files)"""
         if directory:
             self.file_manager.change_directory(directory)
 
-        docx_files = self.file_manager.list_docx_files()
+        docx_files = files if files is not None else self.file_manager.list_docx_files(sort=False)
         if not docx_files:
             print_info("DOCX файлы не найдены в текущем каталоге")
             return 0, 0
 
         print_info(f"Найдено DOCX файлов: {len(docx_files)}")
-        success_count = 0
-
-        for i, docx_file in enumerate(docx_files, 1):
-            show_progress(i, len(docx_files), "Конвертация DOCX -> PDF")
-            if self.docx_to_pdf(docx_file):
-                success_count += 1
-
-        print_summary(success_count, len(docx_files))
-        return success_count, len(docx_files)
+        return self._convert_batch(docx_files, 'docx_to_pdf', '.pdf', "Конвертация DOCX -> PDF", jobs)
 
     def convert_single_pdf_to_docx(self, pdf_path, output_path=None):
         """Конвертация одного PDF файла в DOCX"""
-        return self.pdf_to_docx(pdf_path, output_path)
+        started = time.perf_counter()
+        result = self.pdf_to_docx(pdf_path, output_path)
+        self._record_metrics('pdf_to_docx', pdf_path, 'ok' if result else 'failed', output_path,
+                             time.perf_counter() - started, self.errors.pop(str(Path(pdf_path)), None))
+        return result
 
     def convert_single_docx_to_pdf(self, docx_path, output_path=None):
         """Конвертация одного DOCX файла в PDF"""
-        return self.docx_to_pdf(docx_path, output_path)
\ No newline at end of file
+        started = time.perf_counter()
+        result = self.docx_to_pdf(docx_path, output_path)
+        self._record_metrics('docx_to_pdf', docx_path, 'ok' if result else 'failed', output_path,
+                             time.perf_counter() - started, self.errors.pop(str(Path(docx_path)), None))
+        return result
\ No newline at end of file
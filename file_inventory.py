@@ -0,0 +1,190 @@
+import os
+from pathlib import Path
+
+INVENTORY_FILENAME = '.office_tweaks_inventory.db'
+
+# Частичный хэш: начало и конец файла по PARTIAL_BLOCK байт
+PARTIAL_BLOCK = 64 * 1024
+HASH_CHUNK = 1024 * 1024
+# Потоки чтения файлов при подсчете хэшей (hashlib отпускает GIL)
+HASH_WORKERS = 4
+
+
+def partial_hash(path):
+    """SHA-256 начала и конца файла"""
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_BLOCK))
+        size = os.fstat(f.fileno()).st_size
+        if size > PARTIAL_BLOCK * 2:
+            f.seek(-PARTIAL_BLOCK, os.SEEK_END)
+            digest.update(f.read(PARTIAL_BLOCK))
+        elif size > PARTIAL_BLOCK:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    """SHA-256 всего содержимого файла"""
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FileInventory:
+    """Опись файлов каталога: путь, размер, mtime, inode и хэши содержимого
+
+    Обновление инкрементальное: запись файла меняется, только если изменились
+    его размер или mtime, при этом сохраненные хэши сбрасываются. Хэши
+    считаются лениво - при поиске дубликатов и только для файлов, у которых
+    есть совпадения по размеру.
+    """
+
+    def __init__(self, directory):
+        import sqlite3
+
+        self.directory = Path(directory)
+        self.db_path = self.directory / INVENTORY_FILENAME
+        self.connection = sqlite3.connect(str(self.db_path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        """Создание таблиц описи"""
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                partial_hash TEXT,
+                full_hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS files_size ON files (size);
+        """)
+
+    def close(self):
+        """Закрыть базу описи"""
+        self.connection.commit()
+        self.connection.close()
+
+    @staticmethod
+    def _scope(root):
+        """Границы диапазона путей внутри root (для поиска по индексу)"""
+        prefix = os.path.join(str(Path(root).resolve()), '')
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def _rows(self, root, recursive, columns):
+        """Записи файлов внутри root"""
+        low, high = self._scope(root)
+        rows = self.connection.execute(
+            f"SELECT path, {columns} FROM files WHERE path >= ? AND path < ?", (low, high))
+        if recursive:
+            return list(rows)
+        return [row for row in rows if os.path.dirname(row[0]) == low[:-1]]
+
+    def refresh(self, entries, root, recursive=True):
+        """Обновить опись по файлам entries (os.DirEntry из обхода root)
+
+        Возвращает (всего файлов, новых или измененных, удалено записей).
+        """
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self._rows(root, recursive, 'size, mtime_ns')}
+
+        changed = []
+        total = 0
+        for entry in entries:
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            total += 1
+            path = os.path.abspath(entry.path)
+            if known.pop(path, None) != (stat_result.st_size, stat_result.st_mtime_ns):
+                changed.append((path, stat_result.st_size, stat_result.st_mtime_ns,
+                                stat_result.st_dev, stat_result.st_ino))
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, device, inode, partial_hash, full_hash) "
+                "VALUES (?, ?, ?, ?, ?, NULL, NULL)", changed)
+            # Файлы, которых больше нет
+            self.connection.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in known))
+        return total, len(changed), len(known)
+
+    def get_size(self, path):
+        """Размер файла по описи (None если файла в описи нет)"""
+        row = self.connection.execute(
+            "SELECT size FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return row[0] if row else None
+
+    def _fill_hashes(self, column, paths, hash_function):
+        """Посчитать недостающие хэши; путь -> хэш (недоступные файлы пропускаются)"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def compute(path):
+            try:
+                return path, hash_function(path)
+            except OSError:
+                return path, None
+
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            results = [(path, value) for path, value in executor.map(compute, paths) if value]
+        with self.connection:
+            self.connection.executemany(
+                f"UPDATE files SET {column} = ? WHERE path = ?", ((value, path) for path, value in results))
+        return dict(results)
+
+    def _group_by(self, groups, column, hash_function):
+        """Разбить группы кандидатов по хэшу column; группы из одного файла отбрасываются"""
+        missing = [path for group in groups for path, values in group.items() if not values[column]]
+        computed = self._fill_hashes(column, missing, hash_function)
+
+        result = []
+        for group in groups:
+            by_hash = {}
+            for path, values in group.items():
+                value = values[column] or computed.get(path)
+                if value:
+                    values[column] = value
+                    by_hash.setdefault(value, {})[path] = values
+            result.extend(g for g in by_hash.values() if len(g) > 1)
+        return result
+
+    def find_duplicates(self, root, recursive=True, min_size=1):
+        """Группы файлов с одинаковым содержимым: [[путь, ...], ...]
+
+        Кандидаты отбираются по размеру, затем по частичному хэшу, затем по
+        полному. Жесткие ссылки на один inode считаются одним файлом.
+        Первым в группе идет самый старый файл.
+        """
+        rows = self._rows(root, recursive, 'size, mtime_ns, device, inode, partial_hash, full_hash')
+
+        by_size = {}
+        inodes = set()
+        for path, size, mtime_ns, device, inode, partial, full in sorted(rows, key=lambda r: (r[2], r[0])):
+            # Из жестких ссылок на один inode остается самая старая запись
+            if size < min_size or (device, inode) in inodes:
+                continue
+            inodes.add((device, inode))
+            by_size.setdefault(size, {})[path] = {'size': size, 'mtime_ns': mtime_ns,
+                                                  'partial_hash': partial, 'full_hash': full}
+
+        groups = [g for g in by_size.values() if len(g) > 1]
+        groups = self._group_by(groups, 'partial_hash', partial_hash)
+        for group in groups:
+            # Частичный хэш небольшого файла покрывает все содержимое
+            for values in group.values():
+                if values['size'] <= PARTIAL_BLOCK * 2:
+                    values['full_hash'] = values['full_hash'] or values['partial_hash']
+        groups = self._group_by(groups, 'full_hash', full_hash)
+
+        return sorted((sorted(g, key=lambda p: (g[p]['mtime_ns'], p)) for g in groups), key=lambda g: g[0])
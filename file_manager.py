@@ -1,15 +1,111 @@
 import os
-import shutil
+import re
+import threading
+import time
+from fnmatch import translate
 from pathlib import Path
-from utils import print_success, print_error, print_warning, print_info, confirm_action
+from profiling import profiled
+from utils import print_success, print_error, print_warning, print_info, confirm_action, get_file_size_from_bytes, \
+    Progress
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif']
+
+# Удаление: размер порции путей и число потоков
+DELETE_CHUNK_SIZE = 1000
+DELETE_WORKERS = 8
+
+# Сколько файлов показывать перед подтверждением удаления
+PREVIEW_LIMIT = 50
+
+# Занятое имя отмечается скрытым файлом рядом с результатом: .<имя>.claim
+CLAIM_SUFFIX = '.claim'
+# Метка старше этого срока (секунд) считается оставшейся после сбоя
+CLAIM_MAX_AGE = 24 * 3600
+
+
+def _claim_marker(path):
+    """Скрытая метка занятого имени path"""
+    return path.with_name(f".{path.name}{CLAIM_SUFFIX}")
+
+
+def _claim_owner():
+    """Владелец метки: имя компьютера и номер процесса"""
+    import socket
+
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claim_is_stale(marker):
+    """Метка осталась от завершившегося процесса (в ней записан владелец)
+
+    Процесс проверяется, только если метку создал этот же компьютер; метки
+    других компьютеров (общая или сетевая папка) устаревают по возрасту.
+    """
+    import socket
+
+    try:
+        age = time.time() - marker.stat().st_mtime
+        host, _, pid = marker.read_text(encoding='ascii').rpartition(':')
+        pid = int(pid)
+    except (OSError, ValueError):
+        return False
+    if age > CLAIM_MAX_AGE:
+        return True
+    if os.name == 'nt' or host != socket.gethostname():
+        # os.kill на Windows завершает процесс, проверка только по возрасту
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _compile_name_matcher(pattern_type, pattern):
+    """Функция проверки имени файла для критерия удаления"""
+    if pattern_type == 'regex':
+        return re.compile(pattern, re.IGNORECASE).search
+    if pattern_type == 'glob':
+        return re.compile(translate(pattern), re.IGNORECASE).match
+
+    pattern = pattern.lower()
+    if pattern_type == 'startswith':
+        return lambda name: name.lower().startswith(pattern)
+    if pattern_type == 'endswith':
+        return lambda name: name.lower().endswith(pattern)
+    if pattern_type == 'contains':
+        return lambda name: pattern in name.lower()
+    if pattern_type == 'extension':
+        suffix = '.' + pattern.lstrip('.')
+        return lambda name: name.lower().endswith(suffix)
+    raise ValueError(f"Неизвестный критерий удаления: {pattern_type}")
 
 
 class FileManager:
-    def __init__(self, workdir=None):
+    def __init__(self, workdir=None, use_cache=False, recursive=False, output_root=None, use_journal=False):
         if workdir:
             self.current_directory = Path(workdir).resolve()
         else:
             self.current_directory = Path.cwd()
+        self.use_cache = use_cache
+        self._cache = None
+        self._inventory = None
+        # Обход подкаталогов; результаты повторяют их структуру внутри output_root
+        self.recursive = recursive
+        self.output_root = Path(output_root).resolve() if output_root else None
+        # Журнал пакетного задания: resume_job - идентификатор задания для продолжения
+        self.use_journal = use_journal
+        self.resume_job = None
+        self.active_job = None
+        # Метрики запуска (run_metrics.RunMetrics), None - не собираются
+        self.metrics = None
+        # Выделение уникальных имен: (каталог, основа, расширения) -> следующий номер,
+        # имена, занятые этим процессом (метки .claim)
+        self._name_lock = threading.Lock()
+        self._name_counters = {}
+        self._claimed = set()
 
     def get_current_directory(self):
         """Получить текущий рабочий каталог"""
@@ -44,33 +140,181 @@ class FileManager:
             print_error(f"Ошибка при смене каталога: {str(e)}")
             return False
 
-    def list_files_by_extension(self, extensions):
-        """Получить список файлов по расширениям"""
-        files = []
-        for ext in extensions:
-            pattern = f"*.{ext.lstrip('.')}"
-            files.extend(self.current_directory.glob(pattern))
+    def get_cache(self):
+        """Кэш результатов обработки для текущего каталога (None если отключен)"""
+        if not self.use_cache:
+            return None
+
+        if self._cache is not None and self._cache.directory != self.current_directory:
+            self._cache.close()
+            self._cache = None
+
+        if self._cache is None:
+            try:
+                from conversion_cache import ConversionCache
+                self._cache = ConversionCache(self.current_directory)
+            except Exception as e:
+                print_warning(f"Кэш недоступен, обработка без кэша: {str(e)}")
+                self.use_cache = False
+                return None
+
+        return self._cache
+
+    def get_inventory(self):
+        """Опись файлов текущего каталога (None если база недоступна)"""
+        if self._inventory is not None and self._inventory.directory != self.current_directory:
+            self._inventory.close()
+            self._inventory = None
+
+        if self._inventory is None:
+            try:
+                from file_inventory import FileInventory
+                self._inventory = FileInventory(self.current_directory)
+            except Exception as e:
+                print_error(f"Опись файлов недоступна: {str(e)}")
+                return None
+
+        return self._inventory
+
+    @profiled('inventory_refresh')
+    def refresh_inventory(self, directory=None, recursive=None):
+        """Обновить опись файлов каталога (перечитываются только измененные файлы)"""
+        inventory = self.get_inventory()
+        if inventory is None:
+            return None
+        if recursive is None:
+            recursive = self.recursive
 
-        # Убираем дубликаты и сортируем
-        files = sorted(set(files), key=lambda x: x.name.lower())
-        return [f for f in files if f.is_file()]
+        root = Path(directory or self.current_directory).resolve()
+        entries = (entry for entry in self._walk_files(root, recursive) if not entry.name.startswith('.'))
+        total, changed, removed = inventory.refresh(entries, root, recursive)
+        print_info(f"Опись обновлена: файлов {total}, новых или измененных {changed}, удалено {removed}")
+        return inventory
 
-    def list_pdf_files(self):
+    def start_job(self, operation, params, files):
+        """Журнал пакетного задания и файлы, которые осталось обработать
+
+        Если задан resume_job, продолжается сохраненное задание (файлы берутся
+        из журнала), иначе при use_journal создается новое задание.
+        """
+        from job_journal import JobJournal
+
+        if self.resume_job:
+            job_id, self.resume_job = self.resume_job, None
+            try:
+                journal = JobJournal.open(self.current_directory, job_id)
+            except FileNotFoundError:
+                print_error(f"Задание не найдено: {job_id}")
+                jobs = JobJournal.list_jobs(self.current_directory)
+                if jobs:
+                    print_info(f"Сохраненные задания: {', '.join(jobs)}")
+                return None, []
+            except (OSError, ValueError) as e:
+                print_error(f"Не удалось открыть задание {job_id}: {str(e)}")
+                return None, []
+
+            if journal.operation != operation or journal.params != (params or {}):
+                print_error(f"Задание {job_id} создано для операции {journal.operation} "
+                            f"с параметрами {journal.params}")
+                journal.close()
+                return None, []
+
+            files = journal.remaining_files()
+            print_info(f"Продолжение задания {job_id}, осталось файлов: {len(files)}")
+        elif self.use_journal and files:
+            try:
+                journal = JobJournal.create(self.current_directory, operation, params, files)
+            except OSError as e:
+                print_warning(f"Журнал задания недоступен: {str(e)}")
+                return None, files
+            print_info(f"Задание: {journal.job_id}")
+        else:
+            return None, files
+
+        self.active_job = journal
+        return journal, files
+
+    def finish_job(self):
+        """Закрыть журнал текущего задания"""
+        journal, self.active_job = self.active_job, None
+        if journal is None:
+            return
+        journal.close()
+        if not journal.is_complete():
+            print_info(f"Не все файлы обработаны. Продолжить: --resume {journal.job_id}")
+
+    def iter_file_entries(self, extensions, directory=None, recursive=None):
+        """Ленивый обход каталога за один проход os.scandir (выдает os.DirEntry)
+
+        Расширения сравниваются без учета регистра. Тип файла берется из
+        DirEntry без дополнительного stat. Скрытые файлы и каталоги, а также
+        каталог результатов (output_root) не обходятся.
+        """
+        suffixes = {'.' + ext.lstrip('.').lower() for ext in extensions}
+        if recursive is None:
+            recursive = self.recursive
+        skip_dirs = {str(self.output_root)} if self.output_root else set()
+
+        # Скрытые файлы (в т.ч. незавершенные временные результаты) пропускаются
+        for entry in self._walk_files(directory or self.current_directory, recursive, skip_dirs):
+            if not entry.name.startswith('.') and os.path.splitext(entry.name)[1].lower() in suffixes:
+                yield entry
+
+    def _walk_files(self, directory, recursive, skip_dirs=()):
+        """Файлы каталога (os.DirEntry) за один проход os.scandir; скрытые каталоги не обходятся"""
+        stack = [str(directory)]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive and not entry.name.startswith('.') and entry.path not in skip_dirs:
+                                    stack.append(entry.path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+                        yield entry
+            except OSError as e:
+                print_warning(f"Не удалось прочитать каталог: {str(e)}")
+
+    def iter_files(self, extensions, directory=None, recursive=None):
+        """Ленивый обход каталога: пути файлов с указанными расширениями"""
+        for entry in self.iter_file_entries(extensions, directory, recursive):
+            yield Path(entry.path)
+
+    def list_files_by_extension(self, extensions, sort=True):
+        """Получить список файлов по расширениям
+
+        Отсортированный по имени список нужен для показа пользователю;
+        пакетной обработке порядок не важен (sort=False - без сортировки).
+        """
+        files = list(self.iter_files(extensions))
+        if sort:
+            files.sort(key=lambda x: str(x).lower())
+        return files
+
+    def list_pdf_files(self, sort=True):
         """Список PDF файлов"""
-        return self.list_files_by_extension(['pdf'])
+        return self.list_files_by_extension(['pdf'], sort)
 
-    def list_docx_files(self):
+    def list_docx_files(self, sort=True):
         """Список DOCX файлов"""
-        return self.list_files_by_extension(['docx'])
+        return self.list_files_by_extension(['docx'], sort)
 
-    def list_image_files(self):
+    def list_image_files(self, sort=True):
         """Список изображений"""
-        return self.list_files_by_extension(['jpg', 'jpeg', 'png', 'gif'])
+        return self.list_files_by_extension(IMAGE_EXTENSIONS, sort)
 
     def get_file_size(self, file_path):
         """Получение размера файла в читаемом формате"""
         try:
-            size = os.path.getsize(file_path)
+            # Размер берется из описи, если она уже загружена
+            size = self._inventory.get_size(file_path) if self._inventory else None
+            if size is None:
+                size = os.path.getsize(file_path)
             for unit in ['B', 'KB', 'MB', 'GB']:
                 if size < 1024.0:
                     return f"{size:.2f} {unit}"
@@ -79,8 +323,37 @@ class FileManager:
         except:
             return "unknown size"
 
-    def delete_files_by_pattern(self, pattern_type, pattern, directory=None):
-        """Удаление файлов по шаблону"""
+    def iter_files_to_delete(self, pattern_type, pattern, directory=None, recursive=False,
+                             older_than=None, min_size=None, max_size=None):
+        """Ленивый поиск файлов для удаления
+
+        older_than - минимальный возраст файла в днях (по mtime), min_size и
+        max_size - границы размера в байтах. stat выполняется только при
+        заданных фильтрах возраста или размера.
+        """
+        matches = _compile_name_matcher(pattern_type, pattern)
+        need_stat = older_than is not None or min_size is not None or max_size is not None
+        newest_mtime = time.time() - older_than * 86400 if older_than is not None else None
+
+        for entry in self._walk_files(directory or self.current_directory, recursive):
+            if not matches(entry.name):
+                continue
+            if need_stat:
+                try:
+                    stat_result = entry.stat()
+                except OSError:
+                    continue
+                if newest_mtime is not None and stat_result.st_mtime > newest_mtime:
+                    continue
+                if min_size is not None and stat_result.st_size < min_size:
+                    continue
+                if max_size is not None and stat_result.st_size > max_size:
+                    continue
+            yield Path(entry.path)
+
+    def delete_files_by_pattern(self, pattern_type, pattern, directory=None, recursive=False,
+                                older_than=None, min_size=None, max_size=None):
+        """Удаление файлов по шаблону (список найденных файлов)"""
         try:
             if directory:
                 target_dir = Path(directory)
@@ -91,23 +364,8 @@ class FileManager:
                 print_error(f"Каталог '{target_dir}' не существует")
                 return False
 
-            files_to_delete = []
-
-            for file_path in target_dir.iterdir():
-                if not file_path.is_file():
-                    continue
-
-                filename = file_path.name.lower()
-                pattern_lower = pattern.lower()
-
-                if pattern_type == 'startswith' and filename.startswith(pattern_lower):
-                    files_to_delete.append(file_path)
-                elif pattern_type == 'endswith' and filename.endswith(pattern_lower):
-                    files_to_delete.append(file_path)
-                elif pattern_type == 'contains' and pattern_lower in filename:
-                    files_to_delete.append(file_path)
-                elif pattern_type == 'extension' and filename.endswith('.' + pattern_lower.lstrip('.')):
-                    files_to_delete.append(file_path)
+            files_to_delete = list(self.iter_files_to_delete(
+                pattern_type, pattern, target_dir, recursive, older_than, min_size, max_size))
 
             if not files_to_delete:
                 print_info("Файлы, соответствующие критерию, не найдены")
@@ -115,37 +373,305 @@ class FileManager:
 
             return files_to_delete
 
+        except re.error as e:
+            print_error(f"Некорректное регулярное выражение: {str(e)}")
+            return []
         except Exception as e:
             print_error(f"Ошибка при поиске файлов: {str(e)}")
             return []
 
-    def execute_deletion(self, files_to_delete):
-        """Выполнить удаление файлов"""
-        deleted_count = 0
-        for file_path in files_to_delete:
+    def print_deletion_preview(self, files_to_delete, base_dir=None, limit=PREVIEW_LIMIT):
+        """Список файлов для удаления (не больше limit строк) и их общий размер"""
+        base_dir = Path(base_dir or self.current_directory)
+        total_size = 0
+        for i, file_path in enumerate(files_to_delete, 1):
             try:
-                file_path.unlink()
-                print_success(f"Удален: {file_path.name}")
-                deleted_count += 1
-            except Exception as e:
-                print_error(f"Ошибка при удалении {file_path.name}: {str(e)}")
+                size = file_path.stat().st_size
+            except OSError:
+                size = 0
+            total_size += size
+            if i <= limit:
+                try:
+                    name = file_path.relative_to(base_dir)
+                except ValueError:
+                    name = file_path
+                print(f"  {i}. {name} ({get_file_size_from_bytes(size)})")
+
+        if len(files_to_delete) > limit:
+            print(f"  ... и еще {len(files_to_delete) - limit}")
+        print_info(f"Всего: {len(files_to_delete)} файлов, {get_file_size_from_bytes(total_size)}")
 
-        print_success(f"Удалено файлов: {deleted_count}/{len(files_to_delete)}")
+    @profiled('delete')
+    def execute_deletion(self, files_to_delete, workers=DELETE_WORKERS, quarantine=False, directory=None):
+        """Выполнить удаление файлов
+
+        Пути (список или генератор) читаются порциями по DELETE_CHUNK_SIZE
+        и удаляются в пуле из workers потоков. Вместо строки на каждый файл
+        выводится общий прогресс.
+        При quarantine файлы не удаляются, а переносятся в пакет карантина,
+        который можно восстановить через undo_quarantine. Карантин создается
+        в каталоге удаления directory (по умолчанию рабочий), чтобы перенос
+        был переименованием в пределах одной файловой системы.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from itertools import islice
+
+        batch = None
+        if quarantine:
+            from quarantine import QuarantineBatch
+            try:
+                batch = QuarantineBatch.create(directory or self.current_directory)
+            except OSError as e:
+                print_error(f"Не удалось создать каталог карантина: {str(e)}")
+                return 0
+        remove = batch.move if batch else os.unlink
+
+        def unlink(file_path):
+            try:
+                remove(file_path)
+                return None
+            except OSError as e:
+                return file_path, e
+
+        deleted_count = 0
+        errors = []
+        total = len(files_to_delete) if isinstance(files_to_delete, (list, tuple)) else None
+        files_iter = iter(files_to_delete)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor, Progress(total, "Удаление") as progress:
+                while True:
+                    chunk = list(islice(files_iter, DELETE_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    for error in executor.map(unlink, chunk):
+                        if error is None:
+                            deleted_count += 1
+                        else:
+                            errors.append(error)
+                    progress.update(len(chunk))
+        finally:
+            if batch:
+                batch.close()
+
+        for file_path, error in errors[:10]:
+            print_error(f"Ошибка при удалении {Path(file_path).name}: {str(error)}")
+        if len(errors) > 10:
+            print_error(f"... и еще ошибок: {len(errors) - 10}")
+
+        print_success(f"Удалено файлов: {deleted_count}/{deleted_count + len(errors)}")
+        if batch and batch.moved:
+            undo = f"--undo {batch.batch_id}"
+            if directory and Path(directory).resolve() != self.current_directory:
+                undo += f" --delete-dir {directory}"
+            print_info(f"Файлы перенесены в карантин. Восстановить: {undo}")
         return deleted_count
 
-    def get_unique_filename(self, original_path):
-        """Получить уникальное имя файла"""
+    def undo_quarantine(self, batch_id, directory=None):
+        """Восстановить файлы пакета карантина каталога directory; количество восстановленных файлов"""
+        from quarantine import QuarantineBatch, restore_batch
+
+        directory = directory or self.current_directory
+        if batch_id not in QuarantineBatch.list_batches(directory):
+            print_error(f"Пакет карантина не найден: {batch_id}")
+            batches = QuarantineBatch.list_batches(directory)
+            if batches:
+                print_info(f"Пакеты в карантине: {', '.join(batches)}")
+            return 0
+
+        try:
+            restored, errors = restore_batch(directory, batch_id)
+        except OSError as e:
+            print_error(f"Ошибка при восстановлении пакета {batch_id}: {str(e)}")
+            return 0
+
+        for file_path, error in errors[:10]:
+            print_error(f"Не удалось восстановить {file_path}: {str(error)}")
+        if len(errors) > 10:
+            print_error(f"... и еще ошибок: {len(errors) - 10}")
+        print_success(f"Восстановлено файлов: {restored}")
+        return restored
+
+    def find_duplicate_files(self, action='report', directory=None, recursive=None, min_size=1,
+                             quarantine=False, confirm=True):
+        """Поиск файлов с одинаковым содержимым
+
+        action: report - только список, delete - удалить копии,
+        link - заменить копии жесткими ссылками на оригинал (самый старый
+        файл группы). Возвращает число обработанных копий.
+        """
+        inventory = self.refresh_inventory(directory, recursive)
+        if inventory is None:
+            return 0
+
+        base_dir = Path(directory or self.current_directory).resolve()
+        groups = inventory.find_duplicates(base_dir, self.recursive if recursive is None else recursive, min_size)
+        if not groups:
+            print_info("Дубликаты не найдены")
+            return 0
+
+        wasted = 0
+        for i, group in enumerate(groups, 1):
+            size = inventory.get_size(group[0]) or 0
+            wasted += size * (len(group) - 1)
+            if i <= PREVIEW_LIMIT:
+                print(f"  {i}. {os.path.relpath(group[0], base_dir)} ({get_file_size_from_bytes(size)})")
+                for duplicate in group[1:]:
+                    print(f"     = {os.path.relpath(duplicate, base_dir)}")
+        if len(groups) > PREVIEW_LIMIT:
+            print(f"  ... и еще групп: {len(groups) - PREVIEW_LIMIT}")
+
+        duplicates = [Path(duplicate) for group in groups for duplicate in group[1:]]
+        print_info(f"Групп: {len(groups)}, копий: {len(duplicates)}, "
+                   f"занимают {get_file_size_from_bytes(wasted)}")
+
+        if action == 'report':
+            return 0
+        question = ("Удалить копии?" if action == 'delete'
+                    else "Заменить копии жесткими ссылками на оригиналы?")
+        if confirm and not confirm_action(question):
+            print_info("Операция отменена")
+            return 0
+
+        if action == 'delete':
+            return self.execute_deletion(duplicates, quarantine=quarantine, directory=base_dir)
+
+        linked = 0
+        for group in groups:
+            for duplicate in group[1:]:
+                tmp_path = f"{duplicate}.{os.getpid()}.link"
+                try:
+                    os.link(group[0], tmp_path)
+                    os.replace(tmp_path, duplicate)
+                    linked += 1
+                except OSError as e:
+                    print_error(f"Не удалось создать ссылку {Path(duplicate).name}: {str(e)}")
+                    if os.path.lexists(tmp_path):
+                        os.unlink(tmp_path)
+        print_success(f"Заменено жесткими ссылками: {linked}/{len(duplicates)}")
+        return linked
+
+    def purge_quarantine(self, retention_days=None, directory=None):
+        """Окончательно удалить пакеты карантина каталога directory старше retention_days дней"""
+        from quarantine import purge_expired, RETENTION_DAYS
+
+        if retention_days is None:
+            retention_days = RETENTION_DAYS
+        batches, files = purge_expired(directory or self.current_directory, retention_days)
+        if batches:
+            print_info(f"Очищено пакетов карантина: {batches} (файлов: {files})")
+        return batches
+
+    def get_output_path(self, source, suffix=None, prefix=''):
+        """Путь результата обработки файла
+
+        Без output_root результат создается рядом с исходным файлом, иначе -
+        в output_root с сохранением структуры подкаталогов рабочего каталога.
+        """
+        source = Path(source)
+        name = prefix + (source.stem + suffix if suffix else source.name)
+        if self.output_root is None:
+            return source.parent / name
+
+        try:
+            relative_dir = source.resolve().parent.relative_to(self.current_directory)
+        except ValueError:
+            relative_dir = Path()
+        output_dir = self.output_root / relative_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return output_dir / name
+
+    def get_unique_filename(self, original_path, reserved=None, suffixes=None, claim=False):
+        """Получить уникальное имя файла
+
+        reserved - множество путей, уже выделенных другим задачам пакета
+        (файлы ещё не созданы, но занимать эти имена нельзя).
+        suffixes - расширения, с которыми имя должно быть свободно
+        (формат результата выбирается после обработки).
+        claim - занять имя сразу: для каждого расширения создается скрытая
+        метка .<имя>.claim (O_CREAT | O_EXCL), поэтому одно имя не достанется
+        двум потокам или процессам. Под итоговым именем файл появляется только
+        при записи результата (os.replace), метки удаляет release_filename.
+
+        Номер следующего кандидата запоминается для каталога и основы имени,
+        поэтому очередное имя находится за одну-две проверки.
+        """
         path = Path(original_path)
-        if not path.exists():
+        reserved = reserved or ()
+        suffixes = tuple(suffixes) if suffixes else ()
+
+        def is_free(candidate):
+            variants = [candidate.with_suffix(s) for s in suffixes] if suffixes else [candidate]
+            if any(v in reserved for v in variants):
+                return False
+            if claim:
+                return self._claim(variants)
+            return not any(v.exists() for v in variants)
+
+        if is_free(path):
             return path
 
-        counter = 1
+        key = (str(path.parent), path.stem, suffixes or path.suffix)
+        with self._name_lock:
+            counter = self._name_counters.get(key, 1)
         while True:
-            new_name = f"{path.stem}_{counter}{path.suffix}"
-            new_path = path.parent / new_name
-            if not new_path.exists():
-                return new_path
+            new_path = path.parent / f"{path.stem}_{counter}{path.suffix}"
             counter += 1
+            if is_free(new_path):
+                with self._name_lock:
+                    self._name_counters[key] = max(counter, self._name_counters.get(key, 1))
+                return new_path
+
+    def _claim(self, variants):
+        """Атомарно занять имена всех путей (False - какой-то путь занят)
+
+        Занятость отмечается скрытыми метками с номером процесса, поэтому после
+        аварийного завершения под итоговыми именами не остается пустых файлов,
+        а метки завершившихся процессов не мешают следующим запускам. После
+        создания меток имена проверяются повторно: другой процесс мог записать
+        результат и снять свою метку между первой проверкой и созданием метки.
+        """
+        if any(variant.exists() for variant in variants):
+            return False
+        created = []
+        try:
+            for variant in variants:
+                marker = _claim_marker(variant)
+                try:
+                    fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+                except FileExistsError:
+                    if not _claim_is_stale(marker):
+                        raise
+                    marker.unlink(missing_ok=True)
+                    fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+                with os.fdopen(fd, 'w', encoding='ascii') as f:
+                    f.write(_claim_owner())
+                created.append(variant)
+            if any(variant.exists() for variant in variants):
+                raise FileExistsError
+        except FileExistsError:
+            for variant in created:
+                _claim_marker(variant).unlink(missing_ok=True)
+            return False
+        with self._name_lock:
+            self._claimed.update(created)
+        return True
+
+    def release_filename(self, path, suffixes=None):
+        """Освободить имя, занятое get_unique_filename(claim=True): удалить его метки"""
+        if path is None:
+            return
+        path = Path(path)
+        variants = [path.with_suffix(s) for s in suffixes] if suffixes else [path]
+        for variant in variants:
+            with self._name_lock:
+                if variant not in self._claimed:
+                    continue
+                self._claimed.discard(variant)
+            try:
+                _claim_marker(variant).unlink()
+            except OSError:
+                pass
 
     def create_backup_folder(self):
         """Создать папку для резервных копий"""
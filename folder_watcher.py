@@ -0,0 +1,185 @@
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from utils import print_info, print_warning
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Файл, остающийся пустым дольше этого срока (секунд), больше не ожидается
+EMPTY_FILE_TIMEOUT = 60.0
+
+
+class _Inotify:
+    """Минимальная обертка над inotify через ctypes (только Linux)"""
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+    @classmethod
+    def create(cls, directory):
+        """Создать наблюдатель inotify (None если inotify недоступен)"""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return cls(directory)
+        except (OSError, AttributeError) as e:
+            print_warning(f"inotify недоступен ({str(e)}), используется периодический опрос")
+            return None
+
+    def read_events(self, timeout):
+        """Имена измененных файлов; None в списке означает переполнение очереди"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        data = os.read(self.fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                names.append(None)
+            elif length:
+                names.append(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Наблюдение за рабочим каталогом и передача новых/измененных файлов обработчику
+
+    На Linux используется inotify, на других системах - периодический опрос каталога.
+    Файл передается обработчику только после того, как он перестал меняться
+    settle_time секунд (защита от обработки файлов, которые еще копируются).
+    Фильтр ignore (например, чтение метки в файле) проверяется один раз,
+    когда файл готов, а не на каждое событие записи.
+    """
+
+    def __init__(self, file_manager, extensions, settle_time=2.0, poll_interval=1.0, ignore=None):
+        self.file_manager = file_manager
+        self.directory = file_manager.get_current_directory()
+        self.extensions = {'.' + ext.lstrip('.').lower() for ext in extensions}
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.ignore = ignore
+        self._pending = {}
+
+    def _is_watched(self, path):
+        """Файл подходит по расширению и не является временным"""
+        name = path.name
+        # Скрытые и временные файлы (в т.ч. ~$ файлы блокировки Word)
+        if name.startswith(('.', '~$')):
+            return False
+        return path.suffix.lower() in self.extensions
+
+    def _scan(self):
+        """Снимок каталога: путь -> (размер, mtime)"""
+        snapshot = {}
+        # inotify следит только за самим каталогом, поэтому подкаталоги не обходятся
+        for entry in self.file_manager.iter_file_entries(self.extensions, self.directory, recursive=False):
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            snapshot[Path(entry.path)] = (stat_result.st_size, stat_result.st_mtime_ns)
+        return snapshot
+
+    def _touch(self, path, now):
+        """Отметить файл как измененный"""
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = -1
+        self._pending[path] = (now, size)
+
+    def _collect_ready(self, now):
+        """Файлы, которые не менялись дольше settle_time"""
+        ready = []
+        for path, (last_change, last_size) in list(self._pending.items()):
+            if now - last_change < self.settle_time:
+                continue
+            try:
+                size = path.stat().st_size
+            except OSError:
+                del self._pending[path]
+                continue
+
+            if size != last_size:
+                # Файл еще дописывается
+                self._pending[path] = (now, size)
+                continue
+
+            # Пустой файл - еще не записанный результат; ждем не дольше EMPTY_FILE_TIMEOUT
+            if size == 0:
+                if now - last_change >= EMPTY_FILE_TIMEOUT:
+                    del self._pending[path]
+                    print_warning(f"Файл остается пустым, пропущен: {path.name}")
+                continue
+
+            del self._pending[path]
+            if self.ignore and self.ignore(path):
+                continue
+            ready.append(path)
+        return sorted(ready, key=lambda x: x.name.lower())
+
+    def watch(self, handler):
+        """Бесконечный цикл наблюдения (прерывается Ctrl+C)"""
+        inotify = _Inotify.create(self.directory)
+        snapshot = None if inotify else self._scan()
+        mode = "inotify" if inotify else f"опрос каждые {self.poll_interval} с"
+        print_info(f"Наблюдение за каталогом {self.directory} ({mode}). Ctrl+C для выхода")
+
+        try:
+            while True:
+                if inotify:
+                    for name in inotify.read_events(self.poll_interval):
+                        now = time.monotonic()
+                        if name is None:
+                            # Очередь событий переполнена - проверяем каталог целиком
+                            for path in self._scan():
+                                if self._is_watched(path):
+                                    self._touch(path, now)
+                            continue
+                        path = self.directory / name
+                        if self._is_watched(path):
+                            self._touch(path, now)
+                else:
+                    time.sleep(self.poll_interval)
+                    new_snapshot = self._scan()
+                    now = time.monotonic()
+                    for path, signature in new_snapshot.items():
+                        if snapshot.get(path) != signature and self._is_watched(path):
+                            self._touch(path, now)
+                    snapshot = new_snapshot
+
+                ready = self._collect_ready(time.monotonic())
+                if ready:
+                    handler(ready)
+        finally:
+            if inotify:
+                inotify.close()
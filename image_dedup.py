@@ -0,0 +1,156 @@
+import os
+from utils import iter_parallel
+
+# dHash: сравниваются соседние пиксели уменьшенной копии HASH_SIZE+1 x HASH_SIZE
+HASH_SIZE = 8
+
+
+def perceptual_hash(image_path):
+    """dHash изображения: (64-битный хэш, ширина, высота); None при ошибке
+
+    Хэш не зависит от разрешения и формата, поэтому копии одного снимка
+    разного размера отличаются лишь несколькими битами.
+    """
+    try:
+        from PIL import Image
+
+        with Image.open(image_path) as img:
+            width, height = img.size
+            # JPEG декодируется сразу в уменьшенном масштабе
+            img.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+            small = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS,
+                                            reducing_gap=2.0)
+    except Exception:
+        return None
+
+    pixels = small.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value, width, height
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """BK-дерево для поиска хэшей в пределах расстояния Хэмминга
+
+    Поиск обходит только поддеревья, расстояние до которых может быть
+    не больше max_distance (неравенство треугольника).
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, value, item):
+        node = [value, [item], {}]
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming_distance(value, current[0])
+            if distance == 0:
+                current[1].append(item)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, max_distance):
+        """Элементы с хэшем на расстоянии не больше max_distance"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                found.extend(node[1])
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+def _load_hashes(image_files, cache=None, jobs=1):
+    """Хэши изображений: путь -> (хэш, ширина, высота)
+
+    Хэши берутся из кэша по (путь, размер, mtime), недостающие
+    вычисляются (в пуле процессов при jobs > 1).
+    """
+    hashes = {}
+    missing = []
+    for image_file in image_files:
+        cached = None
+        if cache:
+            try:
+                cached = cache.get_image_hash(image_file, os.stat(image_file))
+            except OSError:
+                continue
+        if cached:
+            hashes[image_file] = cached
+        else:
+            missing.append(image_file)
+
+    if jobs > 1 and len(missing) > 1:
+        results = iter_parallel(perceptual_hash, missing, jobs)
+    else:
+        results = ((image_file, perceptual_hash(image_file)) for image_file in missing)
+
+    for image_file, result in results:
+        if result is None:
+            continue
+        hashes[image_file] = result
+        if cache:
+            try:
+                cache.store_image_hash(image_file, os.stat(image_file), result)
+            except OSError:
+                pass
+    return hashes
+
+
+def find_duplicates(image_files, max_distance, cache=None, jobs=1):
+    """Группировка похожих изображений
+
+    Возвращает (файлы для обработки, {представитель: [дубликаты]}).
+    Представитель группы - изображение с наибольшим разрешением
+    (при равенстве - с наибольшим размером файла, затем первое по имени).
+    Изображения перебираются от лучшего к худшему; каждое попадает в группу
+    ближайшего представителя на расстоянии не больше max_distance или само
+    становится представителем. Поэтому каждая копия близка к представителю
+    своей группы, цепочки похожих изображений в одну группу не сливаются.
+    """
+    hashes = _load_hashes(image_files, cache, jobs)
+
+    def rank(image_file):
+        _, width, height = hashes[image_file]
+        try:
+            size = os.path.getsize(image_file)
+        except OSError:
+            size = 0
+        return -width * height, -size, str(image_file).lower()
+
+    ranks = {image_file: rank(image_file) for image_file in hashes}
+    # Дерево содержит только представителей групп
+    tree = BKTree()
+    groups = {}
+    for image_file in sorted(hashes, key=ranks.get):
+        value = hashes[image_file][0]
+        matches = tree.search(value, max_distance)
+        if matches:
+            nearest = min(matches, key=lambda match: (hamming_distance(value, hashes[match][0]), ranks[match]))
+            groups[nearest].append(image_file)
+        else:
+            groups[image_file] = []
+            tree.add(value, image_file)
+
+    duplicates = {representative: members for representative, members in groups.items() if members}
+    skipped = {duplicate for members in duplicates.values() for duplicate in members}
+    return [f for f in image_files if f not in skipped], duplicates
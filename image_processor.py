@@ -1,12 +1,322 @@
 import os
+import shutil
+import time
 from pathlib import Path
-from utils import print_success, print_error, print_info, show_progress, print_summary
+from profiling import profiled
+from utils import print_success, print_error, print_warning, print_info, Progress, print_summary, atomic_output, \
+    resolve_jobs, iter_parallel, get_file_size_from_bytes
+
+# Форматы с параметром quality, для которых доступен подбор качества
+LOSSY_FORMATS = ('JPEG', 'WEBP', 'AVIF')
+
+# Расширения файлов для форматов, отличных от исходного
+FORMAT_SUFFIXES = {'JPEG': '.jpg', 'WEBP': '.webp', 'AVIF': '.avif', 'PNG': '.png', 'GIF': '.gif'}
+
+# Изображение для оценки сходства уменьшается до этого размера по большей стороне
+SIMILARITY_MAX_SIDE = 512
+
+# Предварительное уменьшение (draft, reduce) оставляет изображение не меньше
+# итогового размера, умноженного на этот запас; остальное делает выбранный фильтр
+REDUCING_GAP = 2.0
+
+# Адаптивное качество: сторона уменьшенной копии для анализа сложности изображения
+ANALYSIS_SIDE = 128
+# Средний перепад яркости между соседними пикселями, соответствующий максимальной сложности
+EDGE_ENERGY_SCALE = 24.0
+
+# Метка в метаданных результатов сжатия: по ней результаты прошлых запусков
+# не обрабатываются повторно (комментарий JPEG/GIF, текст PNG, XMP WebP/AVIF)
+OUTPUT_MARKER = 'office_tweaks'
+PNG_MARKER_KEY = 'Software'
+MARKER_XMP = (
+    '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+    f'<rdf:Description xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmp:CreatorTool="{OUTPUT_MARKER}"/>'
+    '</rdf:RDF></x:xmpmeta>'
+).encode()
+
+# Обработчик дочернего процесса пула (создается один раз на процесс)
+_worker_processor = None
+
+
+def _init_compress_worker(options):
+    """Инициализация процесса пула: Pillow импортируется один раз"""
+    global _worker_processor
+    from file_manager import FileManager
+
+    _worker_processor = ImageProcessor(FileManager(), **options)
+
+
+def _analysis_thumbnail(image_path):
+    """Уменьшенная копия изображения в оттенках серого для анализа сложности (None при ошибке)"""
+    try:
+        import numpy as np
+        from PIL import Image
+
+        with Image.open(image_path) as img:
+            # JPEG декодируется сразу в уменьшенном масштабе
+            img.draft('L', (ANALYSIS_SIDE, ANALYSIS_SIDE))
+            gray = img.convert('L').resize((ANALYSIS_SIDE, ANALYSIS_SIDE), Image.Resampling.BOX, reducing_gap=2.0)
+        return np.asarray(gray)
+    except Exception:
+        return None
+
+
+def _complexity_scores(thumbnails):
+    """Сложность изображений пакета от 0 (однотонное) до 1 (мелкие детали)
+
+    Считается сразу для всех уменьшенных копий (массив N x S x S): энергия
+    границ - средний модуль градиента яркости, и энтропия гистограммы яркости.
+    """
+    import numpy as np
+
+    stack = np.stack(thumbnails).astype(np.float32)
+    count = len(stack)
+
+    edge_energy = (np.abs(np.diff(stack, axis=1)).mean(axis=(1, 2)) +
+                   np.abs(np.diff(stack, axis=2)).mean(axis=(1, 2))) / 2
+    edge_score = np.clip(edge_energy / EDGE_ENERGY_SCALE, 0, 1)
+
+    # Гистограммы всех изображений одним вызовом bincount
+    offsets = (np.arange(count) * 256)[:, None, None]
+    histograms = np.bincount((stack.astype(np.int64) + offsets).ravel(), minlength=count * 256)
+    probabilities = histograms.reshape(count, 256) / float(ANALYSIS_SIDE * ANALYSIS_SIDE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.nansum(probabilities * np.log2(probabilities), axis=1)
+    entropy_score = entropy / 8.0
+
+    return np.clip((edge_score + entropy_score) / 2, 0, 1)
+
+
+def is_own_output(image_path):
+    """Изображение создано этой программой (читается только заголовок файла)"""
+    try:
+        from PIL import Image
+
+        with Image.open(image_path) as img:
+            info = img.info
+    except Exception:
+        return False
+
+    if info.get(PNG_MARKER_KEY) == OUTPUT_MARKER:
+        return True
+    marker = OUTPUT_MARKER.encode()
+    for key in ('comment', 'xmp'):
+        value = info.get(key)
+        if isinstance(value, str):
+            value = value.encode()
+        if value and marker in value:
+            return True
+    return False
+
+
+def _has_alpha(img):
+    """Есть ли у изображения прозрачность"""
+    return img.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in img.info
+
+
+def _prepare_for_format(img, image_format):
+    """Приведение режима изображения к поддерживаемому форматом"""
+    if image_format == 'JPEG' and img.mode not in ('RGB', 'L', 'CMYK'):
+        return img.convert('RGB')
+    if image_format in ('WEBP', 'AVIF') and img.mode not in ('RGB', 'RGBA'):
+        return img.convert('RGBA' if _has_alpha(img) else 'RGB')
+    return img
+
+
+def _supported_formats():
+    """Форматы, которые может записывать установленный Pillow"""
+    from PIL import Image
+
+    try:
+        # AVIF в Pillow до 11.3 доступен через плагин pillow-avif-plugin
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    return set(Image.SAVE)
+
+
+def _similarity(reference, candidate):
+    """Структурное сходство (SSIM) двух изображений в оттенках серого, 1.0 - совпадают
+
+    Считается по неперекрывающимся блокам 8x8 и усредняется.
+    """
+    import numpy as np
+
+    a = np.asarray(reference, dtype=np.float64)
+    b = np.asarray(candidate, dtype=np.float64)
+    block = max(1, min(8, a.shape[0], a.shape[1]))
+    h = a.shape[0] // block * block
+    w = a.shape[1] // block * block
+    a = a[:h, :w].reshape(h // block, block, w // block, block)
+    b = b[:h, :w].reshape(h // block, block, w // block, block)
+
+    mean_a = a.mean(axis=(1, 3), keepdims=True)
+    mean_b = b.mean(axis=(1, 3), keepdims=True)
+    var_a = ((a - mean_a) ** 2).mean(axis=(1, 3))
+    var_b = ((b - mean_b) ** 2).mean(axis=(1, 3))
+    covariance = ((a - mean_a) * (b - mean_b)).mean(axis=(1, 3))
+    mean_a = mean_a[:, 0, :, 0]
+    mean_b = mean_b[:, 0, :, 0]
+
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    ssim = ((2 * mean_a * mean_b + c1) * (2 * covariance + c2)) / \
+        ((mean_a ** 2 + mean_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim.mean())
+
+
+def _compress_worker(task):
+    """Сжатие одного изображения в дочернем процессе пула"""
+    image_path, output_path, quality = task
+    return _worker_processor.compress_image(image_path, quality, output_path=output_path)
 
 
 class ImageProcessor:
-    def __init__(self, file_manager):
+    def __init__(self, file_manager, target_size=None, min_similarity=None,
+                 max_width=None, max_height=None, resample='lanczos', output_format='keep',
+                 min_savings=0.0, in_place=False, png_threads=None, adaptive_min_quality=None,
+                 dedup=None, dedup_distance=6):
         self.file_manager = file_manager
-        self.pillow_available = self._check_pillow()
+        # Подбор качества JPEG/WebP: максимальный размер результата в байтах
+        # и/или минимальное сходство (SSIM 0-1) с исходным изображением
+        self.target_size = target_size
+        self.min_similarity = min_similarity
+        # Уменьшение изображений, не вписывающихся в max_width x max_height
+        self.max_width = max_width
+        self.max_height = max_height
+        self.resample = resample
+        self.output_format = output_format
+        # Результат записывается, только если он меньше исходного хотя бы на min_savings %;
+        # in_place - заменять исходные файлы вместо создания compressed_ копий
+        self.min_savings = min_savings
+        self.in_place = in_place
+        # Адаптивное качество: от adaptive_min_quality (однотонные изображения)
+        # до quality (изображения с мелкими деталями)
+        self.adaptive_min_quality = adaptive_min_quality
+        # Поиск похожих изображений перед сжатием (расстояние Хэмминга между dHash)
+        self.dedup = dedup
+        self.dedup_distance = dedup_distance
+        # Потоки для перебора параметров PNG (None - по числу ядер)
+        self.png_threads = png_threads
+        # Pillow проверяется при первом обращении: операциям без изображений он не нужен
+        self._pillow_available = None
+        self._formats = None
+
+    def _worker_options(self, jobs):
+        """Параметры обработчика для дочерних процессов пакетного режима"""
+        return {
+            'target_size': self.target_size,
+            'min_similarity': self.min_similarity,
+            'max_width': self.max_width,
+            'max_height': self.max_height,
+            'resample': self.resample,
+            'output_format': self.output_format,
+            'min_savings': self.min_savings,
+            'in_place': self.in_place,
+            'adaptive_min_quality': self.adaptive_min_quality,
+            # Потоки PNG делятся между процессами, чтобы всего их было не больше ядер
+            'png_threads': max(1, (self.png_threads or os.cpu_count() or 1) // jobs),
+        }
+
+    def _cache_params(self, quality):
+        """Параметры сжатия для кэша и журнала задания"""
+        params = {'quality': quality}
+        if self.target_size:
+            params['target_size'] = self.target_size
+        if self.min_similarity:
+            params['min_similarity'] = self.min_similarity
+        if self.max_width or self.max_height:
+            params.update(max_width=self.max_width, max_height=self.max_height, resample=self.resample)
+        if self.output_format != 'keep':
+            params['format'] = self.output_format
+        if self.min_savings:
+            params['min_savings'] = self.min_savings
+        if self.in_place:
+            params['in_place'] = True
+        if self.adaptive_min_quality:
+            params['adaptive_min_quality'] = self.adaptive_min_quality
+        return params
+
+    def _adaptive_qualities(self, image_files, quality, jobs=1):
+        """Качество для каждого изображения по сложности его содержимого"""
+        started = time.perf_counter()
+        if jobs > 1 and len(image_files) > 1:
+            loaded = dict(iter_parallel(_analysis_thumbnail, image_files, jobs))
+            thumbnails = [loaded.get(image_file) for image_file in image_files]
+        else:
+            thumbnails = [_analysis_thumbnail(image_file) for image_file in image_files]
+
+        qualities = [quality] * len(image_files)
+        analyzed = [i for i, thumbnail in enumerate(thumbnails) if thumbnail is not None]
+        if analyzed:
+            low = min(self.adaptive_min_quality, quality)
+            scores = _complexity_scores([thumbnails[i] for i in analyzed])
+            for i, score in zip(analyzed, scores):
+                qualities[i] = int(round(low + (quality - low) * float(score)))
+
+        print_info(f"Анализ сложности изображений: {len(analyzed)} за {time.perf_counter() - started:.2f} с")
+        return qualities
+
+    def _candidate_formats(self, source_format, animated=False):
+        """Форматы, в которые кодируется изображение (выбирается наименьший результат)
+
+        Анимация (несколько кадров) кодируется только в исходный формат:
+        при смене формата остался бы один кадр.
+        """
+        if self.output_format == 'keep' or animated:
+            return [source_format]
+
+        if self._formats is None:
+            self._formats = _supported_formats()
+
+        if self.output_format == 'auto':
+            candidates = [source_format] + [f for f in LOSSY_FORMATS if f != source_format]
+            return [f for f in candidates if f in self._formats]
+
+        image_format = self.output_format.upper()
+        if image_format not in self._formats:
+            raise ValueError(f"формат {image_format} не поддерживается установленной версией Pillow")
+        return [image_format]
+
+    def _output_suffixes(self, image_path):
+        """Возможные расширения результата (None - только исходное)"""
+        if self.output_format == 'keep':
+            return None
+        from PIL import Image
+
+        source_format = Image.registered_extensions().get(image_path.suffix.lower())
+        return [image_path.suffix if f == source_format else FORMAT_SUFFIXES[f]
+                for f in self._candidate_formats(source_format)]
+
+    def _downscale(self, img):
+        """Уменьшение изображения до max_width x max_height с сохранением пропорций
+
+        Вызывается до декодирования: JPEG декодируется сразу в уменьшенном
+        масштабе (draft, 1/2-1/8 в области DCT), остальные форматы сначала
+        уменьшаются целочисленно (reduce), затем выбранным фильтром.
+        Возвращает исходный размер, если изображение было уменьшено.
+        """
+        from PIL import Image
+
+        scale = min((self.max_width or img.width) / img.width, (self.max_height or img.height) / img.height)
+        if scale >= 1:
+            return None
+
+        # Итоговый размер с сохранением пропорций, даже если задана только одна граница
+        target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        original_size = img.size
+        if img.format == 'JPEG':
+            img.draft('RGB', (int(target[0] * REDUCING_GAP), int(target[1] * REDUCING_GAP)))
+        img.thumbnail(target, getattr(Image.Resampling, self.resample.upper()), reducing_gap=REDUCING_GAP)
+        return original_size
+
+    @property
+    def pillow_available(self):
+        """Доступность Pillow"""
+        if self._pillow_available is None:
+            self._pillow_available = self._check_pillow()
+        return self._pillow_available
 
     def _check_pillow(self):
         """Проверка доступности Pillow"""
@@ -18,92 +328,517 @@ class ImageProcessor:
             print_info("Установите: pip install Pillow")
             return False
 
-    def compress_image(self, image_path, quality=85, output_dir=None):
-        """Сжатие изображения"""
+    def _search_quality(self, img, save_kwargs, max_quality):
+        """Подбор качества двоичным поиском с кодированием в память
+
+        При заданном min_similarity выбирается наименьшее качество с
+        достаточным сходством, при заданном target_size качество понижается,
+        пока результат не уложится в размер (quality - верхняя граница).
+        Возвращает (данные, качество, число попыток кодирования).
+        """
+        from io import BytesIO
+        from PIL import Image
+
+        encoded = {}
+
+        def encode(q):
+            if q not in encoded:
+                buffer = BytesIO()
+                img.save(buffer, quality=q, **save_kwargs)
+                encoded[q] = buffer.getvalue()
+            return encoded[q]
+
+        best = max_quality
+        if self.min_similarity:
+            reference = img.convert('L')
+            reference.thumbnail((SIMILARITY_MAX_SIDE, SIMILARITY_MAX_SIDE))
+
+            def similar_enough(q):
+                with Image.open(BytesIO(encode(q))) as candidate:
+                    candidate = candidate.convert('L').resize(reference.size)
+                return _similarity(reference, candidate) >= self.min_similarity
+
+            low, high = 1, max_quality
+            while low < high:
+                middle = (low + high) // 2
+                if similar_enough(middle):
+                    high = middle
+                else:
+                    low = middle + 1
+            best = low
+
+        if self.target_size and len(encode(best)) > self.target_size:
+            low, high = 1, best
+            while low < high:
+                middle = (low + high + 1) // 2
+                if len(encode(middle)) <= self.target_size:
+                    low = middle
+                else:
+                    high = middle - 1
+            best = low
+
+        return encode(best), best, len(encoded)
+
+    def _encode(self, img, image_format, quality):
+        """Кодирование изображения в память: (данные, качество, число попыток)"""
+        from io import BytesIO
+
+        if image_format == 'PNG':
+            from png_optimizer import optimize_png
+            data, trials = optimize_png(img, self.png_threads, {PNG_MARKER_KEY: OUTPUT_MARKER})
+            return data, None, trials
+
+        save_kwargs = {'format': image_format}
+        if image_format in ('JPEG', 'GIF'):
+            save_kwargs['optimize'] = True
+            save_kwargs['comment'] = OUTPUT_MARKER.encode()
+        else:
+            save_kwargs['xmp'] = MARKER_XMP
+
+        if image_format not in LOSSY_FORMATS:
+            buffer = BytesIO()
+            img.save(buffer, **save_kwargs)
+            return buffer.getvalue(), None, 1
+
+        if self.target_size or self.min_similarity:
+            return self._search_quality(img, save_kwargs, quality)
+
+        buffer = BytesIO()
+        img.save(buffer, quality=quality, **save_kwargs)
+        return buffer.getvalue(), quality, 1
+
+    def _encode_animated(self, img, image_format, quality):
+        """Кодирование всех кадров анимации (GIF, APNG, WebP): (данные, качество, число попыток)"""
+        from io import BytesIO
+
+        save_kwargs = {'format': image_format, 'save_all': True}
+        if image_format == 'GIF':
+            save_kwargs.update(optimize=True, comment=OUTPUT_MARKER.encode())
+        elif image_format == 'PNG':
+            from PIL.PngImagePlugin import PngInfo
+
+            save_kwargs['pnginfo'] = PngInfo()
+            save_kwargs['pnginfo'].add_text(PNG_MARKER_KEY, OUTPUT_MARKER)
+        else:
+            save_kwargs['xmp'] = MARKER_XMP
+        if image_format not in LOSSY_FORMATS:
+            quality = None
+        else:
+            save_kwargs['quality'] = quality
+
+        buffer = BytesIO()
+        img.save(buffer, **save_kwargs)
+        return buffer.getvalue(), quality, 1
+
+    @profiled('compress_image', per_file=True)
+    def compress_image(self, image_path, quality=85, output_dir=None, output_path=None):
+        """Сжатие изображения
+
+        Изображение кодируется в память; результат записывается (атомарно),
+        только если он меньше исходного файла хотя бы на min_savings %.
+        Возвращает (успех, экономия в байтах, экономия в %, сведения), где
+        сведения - словарь: output_path, format, trials (число попыток
+        кодирования), original_size, output_size, timings (секунды этапов
+        decode, encode, write) и written (False - результат не записан); при
+        ошибке - только error.
+        """
         if not self.pillow_available:
-            return False, 0, 0
+            return False, 0, 0, {}
 
+        claimed_path = None
         try:
             from PIL import Image
+            from png_optimizer import png_bit_depth
 
             image_path = Path(image_path)
-            if not image_path.exists():
+            try:
+                original_size = image_path.stat().st_size
+            except FileNotFoundError:
                 print_error(f"Файл не найден: {image_path}")
-                return False, 0, 0
-
-            if output_dir is None:
-                output_dir = image_path.parent
+                return False, 0, 0, {}
 
-            output_dir = Path(output_dir)
-            output_dir.mkdir(exist_ok=True)
-
-            output_path = output_dir / f"compressed_{image_path.name}"
-
-            # Проверка существования выходного файла
-            if output_path.exists():
-                output_path = self.file_manager.get_unique_filename(output_path)
+            if output_path is None:
+                output_path = claimed_path = self._get_output_path(image_path, output_dir)
+            else:
+                output_path = Path(output_path)
+                output_path.parent.mkdir(exist_ok=True)
 
             print_info(f"Сжатие: {image_path.name} (качество: {quality}%)")
 
             # Открытие и обработка изображения
+            started = time.perf_counter()
             with Image.open(image_path) as img:
-                original_size = os.path.getsize(image_path)
+                if img.format == 'PNG' and (png_bit_depth(image_path) or 8) > 8:
+                    # Pillow декодирует 16-битные отсчеты в 8-битные - сжатие было бы с потерями
+                    print_info(f"PNG с глубиной больше 8 бит оставлен без изменений: {image_path.name}")
+                    return True, 0, 0, {'format': 'PNG', 'trials': 0, 'original_size': original_size,
+                                        'output_size': original_size, 'output_path': str(image_path),
+                                        'written': False}
+
+                animated = getattr(img, 'n_frames', 1) > 1
+                if animated and (self.max_width or self.max_height):
+                    print_info(f"Анимация не уменьшается: {image_path.name}")
+                elif self.max_width or self.max_height:
+                    original_dimensions = self._downscale(img)
+                    if original_dimensions:
+                        print_info(f"Размер уменьшен: {original_dimensions[0]}x{original_dimensions[1]} -> "
+                                   f"{img.width}x{img.height}")
+                img.load()
+                decoded = time.perf_counter()
+
+                # Кодирование в память во всех форматах-кандидатах, сохраняется наименьший результат
+                source_format = Image.registered_extensions().get(output_path.suffix.lower())
+                trials = 0
+                best = None
+                for image_format in self._candidate_formats(source_format, animated):
+                    if image_format == 'JPEG' and self.output_format == 'auto' and _has_alpha(img):
+                        # JPEG не хранит прозрачность
+                        continue
+                    if animated:
+                        data, chosen_quality, format_trials = self._encode_animated(img, image_format, quality)
+                    else:
+                        data, chosen_quality, format_trials = self._encode(
+                            _prepare_for_format(img, image_format), image_format, quality)
+                    trials += format_trials
+                    if best is None or len(data) < len(best[0]):
+                        best = (data, image_format, chosen_quality)
+                data, image_format, chosen_quality = best
+                encoded = time.perf_counter()
+
+            if image_format != source_format or trials > 1:
+                quality_note = f", качество {chosen_quality}%" if chosen_quality else ""
+                print_info(f"Формат: {image_format}{quality_note} (попыток: {trials})")
+            if self.target_size and len(data) > self.target_size:
+                print_warning(f"Не удалось уложиться в {self.target_size} байт: {image_path.name}")
 
-                # Конвертируем в RGB если нужно (для JPEG)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
+            details = {'format': image_format, 'quality': chosen_quality, 'trials': trials,
+                       'original_size': original_size, 'output_size': len(data),
+                       'timings': {'decode': decoded - started, 'encode': encoded - decoded}}
 
-                # Параметры сохранения в зависимости от формата
-                save_kwargs = {'quality': quality, 'optimize': True}
-                if image_path.suffix.lower() == '.png':
-                    save_kwargs = {'optimize': True}
+            # Результат без заметного выигрыша не записывается
+            new_size = len(data)
+            if new_size >= original_size or original_size - new_size < original_size * self.min_savings / 100:
+                print_info(f"Сжатие не дает выигрыша, файл оставлен без изменений: {image_path.name}")
+                details.update(output_path=str(image_path), written=False)
+                return True, 0, 0, details
 
-                # Сохраняем изображение
-                img.save(output_path, **save_kwargs)
-                new_size = os.path.getsize(output_path)
+            if self.in_place and image_format == source_format:
+                output_path = image_path
+            elif image_format != source_format:
+                output_path = output_path.with_suffix(FORMAT_SUFFIXES[image_format])
 
-                # Расчет экономии
-                savings = original_size - new_size
-                savings_percent = (savings / original_size) * 100 if original_size > 0 else 0
+            with atomic_output(output_path) as tmp_path:
+                tmp_path.write_bytes(data)
+            details['timings']['write'] = time.perf_counter() - encoded
+            if self.in_place and output_path != image_path:
+                # Формат изменился: исходный файл заменяется файлом с новым расширением
+                image_path.unlink()
 
-                print_success(f"Сжато успешно. Экономия: {savings_percent:.1f}%")
+            # Расчет экономии
+            savings = original_size - new_size
+            savings_percent = (savings / original_size) * 100 if original_size > 0 else 0
 
-                return True, savings, savings_percent
+            print_success(f"Сжато успешно. Экономия: {savings_percent:.1f}%")
+
+            details.update(output_path=str(output_path), written=True)
+            return True, savings, savings_percent, details
 
         except Exception as e:
             print_error(f"Ошибка сжатия изображения {image_path.name}: {str(e)}")
-            return False, 0, 0
+            return False, 0, 0, {'error': str(e)}
+        finally:
+            if claimed_path is not None:
+                self.file_manager.release_filename(claimed_path, self._output_suffixes(image_path))
+
+    def _get_output_path(self, image_path, output_dir=None):
+        """Путь для сжатого изображения
+
+        Имя занимается сразу во всех возможных форматах результата
+        (метки занятых имен удаляет FileManager.release_filename).
+        """
+        if self.in_place:
+            # Исходный файл заменяется; новое имя нужно, только если может смениться формат
+            suffixes = [s for s in self._output_suffixes(image_path) or [] if s != image_path.suffix]
+            if not suffixes:
+                return image_path
+            output_path = self.file_manager.get_unique_filename(
+                image_path.with_suffix(suffixes[0]), suffixes=suffixes, claim=True)
+            return output_path.with_suffix(image_path.suffix)
 
-    def compress_all_images(self, directory=None, quality=85):
-        """Сжатие всех изображений"""
+        if output_dir is None:
+            output_path = self.file_manager.get_output_path(image_path, prefix='compressed_')
+        else:
+            output_dir = Path(output_dir)
+            output_dir.mkdir(exist_ok=True)
+            output_path = output_dir / f"compressed_{image_path.name}"
+
+        return self.file_manager.get_unique_filename(
+            output_path, suffixes=self._output_suffixes(image_path), claim=True)
+
+    @staticmethod
+    def _can_link_duplicate(representative, source_output, duplicate):
+        """Результат представителя подходит копии: тот же размер в пикселях и файл не больше копии"""
+        from PIL import Image
+
+        try:
+            with Image.open(representative) as source_img, Image.open(duplicate) as duplicate_img:
+                same_dimensions = source_img.size == duplicate_img.size
+            return same_dimensions and os.path.getsize(source_output) <= os.path.getsize(duplicate)
+        except Exception:
+            return False
+
+    def _link_duplicate(self, source_output, duplicate):
+        """Результат для дубликата - жесткая ссылка (или копия) на результат представителя"""
+        source_output = Path(source_output)
+        output_path = self.file_manager.get_unique_filename(
+            self.file_manager.get_output_path(duplicate, prefix='compressed_').with_suffix(source_output.suffix),
+            claim=True)
+        tmp_path = output_path.with_name(f".{output_path.stem}.{os.getpid()}.link{output_path.suffix}")
+        try:
+            try:
+                os.link(source_output, tmp_path)
+            except OSError:
+                shutil.copyfile(source_output, tmp_path)
+            # Итоговое имя появляется только вместе с готовой ссылкой
+            os.replace(tmp_path, output_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            self.file_manager.release_filename(output_path)
+        return output_path
+
+    def _own_outputs(self, image_files, quality):
+        """Результаты прошлых запусков среди image_files
+
+        Результаты, записанные в кэше, определяются по размеру и mtime без
+        открытия файла; метка в метаданных читается только у файлов, для
+        которых в кэше нет актуального результата сжатия.
+        """
+        cache = self.file_manager.get_cache()
+        if not cache:
+            return {f for f in image_files if is_own_output(f)}
+
+        known = cache.known_outputs('compress_image')
+        cache_params = self._cache_params(quality)
+        own_outputs = set()
+        for image_file in image_files:
+            path = Path(image_file).resolve()
+            recorded = known.get(str(path))
+            if recorded:
+                try:
+                    stat_result = path.stat()
+                except OSError:
+                    continue
+                if (stat_result.st_size, stat_result.st_mtime_ns) == recorded:
+                    own_outputs.add(image_file)
+                    continue
+            if cache.lookup(image_file, 'compress_image', cache_params) is None and is_own_output(image_file):
+                own_outputs.add(image_file)
+        return own_outputs
+
+    def compress_all_images(self, directory=None, quality=85, files=None, jobs=1):
+        """Сжатие всех изображений (или только файлов из списка files)"""
         if not self.pillow_available:
             return 0, 0, 0, 0
 
         if directory:
             self.file_manager.change_directory(directory)
 
-        image_files = self.file_manager.list_image_files()
+        image_files = files if files is not None else self.file_manager.list_image_files(sort=False)
+
+        # Результаты прошлых запусков (с меткой программы) повторно не сжимаются
+        own_outputs = self._own_outputs(image_files, quality)
+        if own_outputs:
+            print_info(f"Пропущено ранее сжатых файлов: {len(own_outputs)}")
+            image_files = [f for f in image_files if f not in own_outputs]
+
         if not image_files:
             print_info("Изображения не найдены в текущем каталоге")
             return 0, 0, 0, 0
 
         print_info(f"Найдено изображений: {len(image_files)} (качество: {quality}%)")
-        success_count = 0
+        journal, image_files = self.file_manager.start_job('compress_image', self._cache_params(quality), image_files)
+        try:
+            return self._compress_batch(image_files, quality, journal, jobs)
+        finally:
+            self.file_manager.finish_job()
+
+    @profiled('compress_batch')
+    def _compress_batch(self, image_files, quality, journal, jobs=1):
+        """Сжатие изображений пакета с отметкой результатов в журнале задания"""
+        from job_journal import STATE_DONE, STATE_FAILED, STATE_SKIPPED
+
+        total = len(image_files)
+        cache = self.file_manager.get_cache()
+        cache_params = self._cache_params(quality)
+
+        # Изображения, сжатая копия которых уже есть и не изменилась, пропускаются
+        cache_hits = 0
+        if cache:
+            pending, cache_hits = cache.split_cached(
+                image_files, 'compress_image', cache_params,
+                output_dir=lambda f: f.parent if self.in_place else self.file_manager.get_output_path(f).parent)
+            if cache_hits:
+                print_info(f"Без изменений (пропущено по кэшу): {cache_hits}")
+            skipped = set(image_files).difference(pending)
+            for image_file in skipped:
+                if journal:
+                    journal.record(image_file, STATE_DONE)
+                self._record_metrics(image_file, 'cached')
+            image_files = pending
+
+        # Похожие изображения: сжимается только представитель группы
+        duplicates = {}
+        duplicate_count = 0
+        if self.dedup and len(image_files) > 1:
+            from image_dedup import find_duplicates
+            image_files, duplicates = find_duplicates(image_files, self.dedup_distance, cache, resolve_jobs(jobs))
+            duplicate_count = sum(len(group) for group in duplicates.values())
+            if duplicates:
+                print_info(f"Найдено групп похожих изображений: {len(duplicates)}, "
+                           f"копий пропущено: {duplicate_count}")
+
+        success_count = cache_hits
         total_savings = 0
         total_original_size = 0
+        total_trials = 0
+        chosen_qualities = []
+        # Формат -> [число файлов, сэкономлено байт]
+        format_stats = {}
+        unchanged_count = 0
 
-        for i, image_file in enumerate(image_files, 1):
-            show_progress(i, len(image_files), "Сжатие изображений")
-            success, savings, percent = self.compress_image(image_file, quality)
-            if success:
+        # Имена выходных файлов занимаются заранее в главном процессе,
+        # чтобы параллельные процессы не выбрали одно и то же имя
+        tasks = [(image_file, self._get_output_path(image_file), quality) for image_file in image_files]
+
+        jobs = min(resolve_jobs(jobs), len(tasks))
+        if self.adaptive_min_quality and tasks:
+            qualities = self._adaptive_qualities([task[0] for task in tasks], quality, jobs)
+            tasks = [(image_file, output_path, q) for (image_file, output_path, _), q in zip(tasks, qualities)]
+        if jobs > 1:
+            print_info(f"Параллельная обработка: {jobs} процессов")
+            results = iter_parallel(_compress_worker, tasks, jobs, initializer=_init_compress_worker,
+                                    initargs=(self._worker_options(jobs),))
+        else:
+            results = ((task, self.compress_image(task[0], task[2], output_path=task[1])) for task in tasks)
+
+        outputs = {}
+        try:
+            with Progress(total, "Сжатие изображений", initial=cache_hits + duplicate_count) as progress:
+                for task, result in results:
+                    image_file, output_path, file_quality = task
+                    success, savings, percent, details = result or (False, 0, 0, {})
+                    total_trials += details.get('trials', 0)
+                    progress.update(nbytes=details.get('original_size', 0))
+                    if success:
+                        chosen_qualities.append(file_quality)
+                        if details['written']:
+                            outputs[image_file] = details['output_path']
+                            stats = format_stats.setdefault(details['format'], [0, 0])
+                            stats[0] += 1
+                            stats[1] += savings
+                        else:
+                            unchanged_count += 1
+                        success_count += 1
+                        total_savings += savings
+                        total_original_size += details['original_size']
+                        if cache and details['written']:
+                            cache.store(image_file, 'compress_image', cache_params, details['output_path'])
+                    if journal:
+                        journal.record(image_file, STATE_DONE if success else STATE_FAILED)
+                    self._record_metrics(image_file, details=details)
+        finally:
+            # Метки занятых имен всех файлов пакета
+            for image_file, output_path, _ in tasks:
+                self.file_manager.release_filename(output_path, self._output_suffixes(image_file))
+
+        for representative, group in duplicates.items():
+            print_info(f"{representative.name} <- {', '.join(d.name for d in group)}")
+            for duplicate in group:
+                output_path = None
+                link = self.dedup == 'link' and not self.in_place and representative in outputs
+                if link and not self._can_link_duplicate(representative, outputs[representative], duplicate):
+                    # Другое разрешение или результат больше копии - копия сжимается отдельно
+                    success, savings, _, details = self.compress_image(duplicate, quality)
+                    if success:
+                        success_count += 1
+                        total_savings += savings
+                        total_original_size += details['original_size']
+                        if cache and details['written']:
+                            cache.store(duplicate, 'compress_image', cache_params, details['output_path'])
+                    if journal:
+                        journal.record(duplicate, STATE_DONE if success else STATE_FAILED)
+                    self._record_metrics(duplicate, details=details)
+                    continue
+                if not link:
+                    # Копия без результата: не обработана, но и не ошибка - в итоги не входит
+                    total -= 1
+                    self._record_metrics(duplicate, 'duplicate')
+                    if journal:
+                        journal.record(duplicate, STATE_SKIPPED)
+                    continue
+                try:
+                    output_path = self._link_duplicate(outputs[representative], duplicate)
+                except OSError as e:
+                    print_error(f"Не удалось создать ссылку для {duplicate.name}: {str(e)}")
+                    self._record_metrics(duplicate, details={'error': str(e)})
+                    if journal:
+                        journal.record(duplicate, STATE_FAILED)
+                    continue
+                if cache:
+                    cache.store(duplicate, 'compress_image', cache_params, output_path)
+                self._record_metrics(duplicate, 'duplicate', output=output_path)
                 success_count += 1
-                total_savings += savings
-                total_original_size += os.path.getsize(image_file)
+                if journal:
+                    journal.record(duplicate, STATE_DONE)
 
-        print_summary(success_count, len(image_files), total_savings, total_original_size)
-        return success_count, len(image_files), total_savings, total_original_size
+        if cache:
+            cache.commit()
+
+        print_summary(success_count, total, total_savings, total_original_size, cache_hits)
+        if (self.target_size or self.min_similarity) and tasks:
+            print_info(f"Попыток кодирования: {total_trials}, в среднем {total_trials / len(tasks):.1f} на файл")
+        if self.adaptive_min_quality and chosen_qualities:
+            print_info(f"Адаптивное качество: от {min(chosen_qualities)}% до {max(chosen_qualities)}%, "
+                       f"в среднем {sum(chosen_qualities) / len(chosen_qualities):.0f}%")
+        if unchanged_count:
+            print_info(f"Оставлено без изменений (сжатие не дает выигрыша): {unchanged_count}")
+        if self.output_format != 'keep' and format_stats:
+            processed = sum(count for count, _ in format_stats.values())
+            print_info("Выбранные форматы:")
+            for image_format, (count, saved) in sorted(format_stats.items(), key=lambda item: -item[1][0]):
+                print_info(f"{image_format}: {count} ({count / processed * 100:.1f}%), "
+                           f"экономия {get_file_size_from_bytes(saved)}")
+        return success_count, total, total_savings, total_original_size
 
     def compress_single_image(self, image_path, quality=85, output_dir=None):
         """Сжатие одного изображения"""
-        success, savings, percent = self.compress_image(image_path, quality, output_dir)
-        return success
\ No newline at end of file
+        if self.adaptive_min_quality and self.pillow_available:
+            quality = self._adaptive_qualities([Path(image_path)], quality)[0]
+        success, savings, percent, details = self.compress_image(image_path, quality, output_dir)
+        self._record_metrics(image_path, details=details)
+        return success
+
+    def _record_metrics(self, image_path, status=None, details=None, output=None):
+        """Событие сжатия файла в метриках запуска (если они собираются)"""
+        metrics = self.file_manager.metrics
+        if metrics is None:
+            return
+        from run_metrics import file_size
+
+        details = details or {}
+        if status is None:
+            if 'error' in details or 'written' not in details:
+                status = 'failed'
+            else:
+                status = 'ok' if details['written'] else 'unchanged'
+        timings = dict(details.get('timings', {}))
+        if timings:
+            timings['total'] = sum(timings.values())
+        written = details.get('written')
+        metrics.record('compress_image', image_path, status,
+                       output=details.get('output_path') if written else output,
+                       input_bytes=details.get('original_size') or file_size(image_path),
+                       output_bytes=details.get('output_size', 0) if written else file_size(output),
+                       timings=timings, backend=f"pillow/{details['format']}" if 'format' in details else 'pillow',
+                       error=details.get('error'), quality=details.get('quality'))
\ No newline at end of file
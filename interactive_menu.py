@@ -1,4 +1,3 @@
-import os
 from utils import print_success, print_error, print_info, print_warning, validate_number_input, print_banner
 
 
@@ -11,7 +10,6 @@ class InteractiveMenu:
 
     def display_menu(self):
         """Отображение главного меню"""
-        os.system('cls' if os.name == 'nt' else 'clear')
         print_banner(self.version)
         print(f"Текущий каталог: {self.file_manager.get_current_directory()}")
         print(f"{'=' * 50}")
@@ -203,9 +201,7 @@ class InteractiveMenu:
 
                     if files_to_delete:
                         print_info(f"Найдено файлов для удаления: {len(files_to_delete)}")
-                        for i, file_path in enumerate(files_to_delete, 1):
-                            size = self.file_manager.get_file_size(file_path)
-                            print(f"  {i}. {file_path.name} ({size})")
+                        self.file_manager.print_deletion_preview(files_to_delete)
 
                         from utils import confirm_action
                         if confirm_action("Вы уверены, что хотите удалить эти файлы?"):
@@ -0,0 +1,133 @@
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+JOURNAL_DIRNAME = '.office_tweaks_jobs'
+
+STATE_PENDING = 'pending'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+# Файл намеренно не обрабатывался (копия похожего изображения); повторно не берется
+STATE_SKIPPED = 'skipped'
+
+# Записи сбрасываются на диск (fsync) не реже чем раз в CHECKPOINT_RECORDS
+# записей или CHECKPOINT_SECONDS секунд
+CHECKPOINT_RECORDS = 25
+CHECKPOINT_SECONDS = 2.0
+
+
+class JobJournal:
+    """Журнал пакетного задания для продолжения обработки после сбоя
+
+    Файл журнала - JSON строки, только дозапись. Первая строка - заголовок
+    задания (операция и параметры), далее состояния файлов: pending при
+    создании задания, done или failed по мере обработки. При чтении
+    действует последняя запись для файла; оборванная последняя строка
+    (сбой во время записи) игнорируется.
+    """
+
+    def __init__(self, path, job_id, operation, params, states):
+        self.path = Path(path)
+        self.job_id = job_id
+        self.operation = operation
+        self.params = params or {}
+        self.states = states
+        self._file = open(self.path, 'a', encoding='utf-8')
+        # Оборванная при сбое строка не должна склеиться со следующей записью
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write('\n')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def journal_dir(directory):
+        """Каталог журналов заданий"""
+        return Path(directory) / JOURNAL_DIRNAME
+
+    @classmethod
+    def create(cls, directory, operation, params, files):
+        """Новое задание: все файлы в состоянии pending"""
+        journal_dir = cls.journal_dir(directory)
+        journal_dir.mkdir(exist_ok=True)
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        states = {str(Path(f).resolve()): STATE_PENDING for f in files}
+
+        journal = cls(journal_dir / f"{job_id}.jsonl", job_id, operation, params, states)
+        journal._append({'job': job_id, 'operation': operation, 'params': journal.params})
+        for source in states:
+            journal._append({'file': source, 'state': STATE_PENDING})
+        journal.checkpoint()
+        return journal
+
+    @classmethod
+    def open(cls, directory, job_id):
+        """Открыть существующее задание (FileNotFoundError если его нет)"""
+        path = cls.journal_dir(directory) / f"{job_id}.jsonl"
+        header = None
+        states = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if header is None:
+                    header = record
+                elif 'file' in record:
+                    states[record['file']] = record['state']
+
+        if header is None or 'operation' not in header:
+            raise ValueError(f"Журнал задания поврежден: {path.name}")
+        return cls(path, job_id, header['operation'], header.get('params'), states)
+
+    @classmethod
+    def list_jobs(cls, directory):
+        """Идентификаторы сохраненных заданий"""
+        journal_dir = cls.journal_dir(directory)
+        if not journal_dir.is_dir():
+            return []
+        return sorted(p.stem for p in journal_dir.glob('*.jsonl'))
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._unsynced += 1
+
+    def record(self, source, state):
+        """Записать состояние файла"""
+        source = str(Path(source).resolve())
+        self.states[source] = state
+        self._append({'file': source, 'state': state})
+        if (self._unsynced >= CHECKPOINT_RECORDS
+                or time.monotonic() - self._last_sync >= CHECKPOINT_SECONDS):
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Сбросить накопленные записи на диск"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def remaining_files(self):
+        """Файлы, которые еще не обработаны успешно (pending и failed)"""
+        return [Path(source) for source, state in self.states.items() if state not in (STATE_DONE, STATE_SKIPPED)]
+
+    def is_complete(self):
+        """Все файлы задания обработаны успешно или пропущены"""
+        return all(state in (STATE_DONE, STATE_SKIPPED) for state in self.states.values())
+
+    def close(self):
+        """Закрыть журнал; журнал полностью выполненного задания удаляется"""
+        if self._file.closed:
+            return
+        self.checkpoint()
+        self._file.close()
+        if self.is_complete():
+            self.path.unlink()
@@ -0,0 +1,205 @@
+import atexit
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from utils import print_warning
+
+SOFFICE_CANDIDATES = [
+    '/usr/lib/libreoffice/program/soffice',
+    '/opt/libreoffice/program/soffice',
+    '/Applications/LibreOffice.app/Contents/MacOS/soffice',
+    r'C:\Program Files\LibreOffice\program\soffice.exe',
+]
+
+
+def find_soffice():
+    """Поиск исполняемого файла LibreOffice (None если не найден)"""
+    for name in ('soffice', 'libreoffice'):
+        path = shutil.which(name)
+        if path:
+            return path
+
+    for candidate in SOFFICE_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def libreoffice_available():
+    """Проверка доступности LibreOffice и модуля UNO"""
+    try:
+        import uno
+    except ImportError:
+        return False
+    return find_soffice() is not None
+
+
+def _free_port():
+    """Свободный TCP порт на localhost"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _property(name, value):
+    """Создание com.sun.star.beans.PropertyValue"""
+    from com.sun.star.beans import PropertyValue
+
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+class LibreOfficeInstance:
+    """Один запущенный headless soffice, принимающий документы через UNO"""
+
+    def __init__(self, soffice_path, startup_timeout=30):
+        self.soffice_path = soffice_path
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.profile_dir = None
+        self.desktop = None
+
+    def is_alive(self):
+        """Процесс soffice запущен и не завершился"""
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Запуск soffice с отдельным профилем и подключение к нему"""
+        port = _free_port()
+        # Собственный профиль нужен, иначе экземпляры блокируют друг друга
+        self.profile_dir = tempfile.mkdtemp(prefix='office_tweaks_lo_')
+        self.process = subprocess.Popen(
+            [
+                self.soffice_path,
+                '--headless', '--invisible', '--nologo', '--nodefault',
+                '--norestore', '--nolockcheck',
+                f'-env:UserInstallation={Path(self.profile_dir).as_uri()}',
+                f'--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext',
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.desktop = self._connect(port)
+
+    def _connect(self, port):
+        """Ожидание готовности soffice и получение com.sun.star.frame.Desktop"""
+        import uno
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        url = f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+        deadline = time.monotonic() + self.startup_timeout
+
+        while True:
+            if not self.is_alive():
+                raise RuntimeError("soffice завершился при запуске")
+            try:
+                context = resolver.resolve(url)
+                return context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("soffice не ответил за отведённое время")
+                time.sleep(0.25)
+
+    def convert(self, source, output_path):
+        """Экспорт документа в PDF"""
+        import uno
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(str(Path(source).resolve())), "_blank", 0,
+            (_property("Hidden", True), _property("ReadOnly", True))
+        )
+        if document is None:
+            raise RuntimeError("LibreOffice не смог открыть документ")
+
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(str(Path(output_path).resolve())),
+                (_property("FilterName", "writer_pdf_Export"),)
+            )
+        finally:
+            document.close(True)
+
+    def stop(self):
+        """Остановка soffice и удаление временного профиля"""
+        if self.is_alive():
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+        self.desktop = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def restart(self):
+        """Перезапуск экземпляра"""
+        self.stop()
+        self.start()
+
+
+class LibreOfficePool:
+    """Пул постоянно запущенных экземпляров LibreOffice для конвертации DOCX -> PDF
+
+    Экземпляры запускаются при первом обращении и остаются «тёплыми» между файлами.
+    Упавший экземпляр перезапускается, а файл отправляется на повторную попытку.
+    Метод convert можно вызывать из нескольких потоков одновременно.
+    """
+
+    def __init__(self, size=2, soffice_path=None, retries=1):
+        import uno  # ImportError, если модуль UNO недоступен
+
+        self.soffice_path = soffice_path or find_soffice()
+        if not self.soffice_path:
+            raise RuntimeError("LibreOffice (soffice) не найден")
+
+        self.size = max(1, size)
+        self.retries = retries
+        self._instances = [LibreOfficeInstance(self.soffice_path) for _ in range(self.size)]
+        self._idle = queue.Queue()
+        for instance in self._instances:
+            self._idle.put(instance)
+
+        atexit.register(self.close)
+
+    def convert(self, source, output_path):
+        """Конвертация файла на свободном экземпляре пула"""
+        instance = self._idle.get()
+        try:
+            for attempt in range(self.retries + 1):
+                if not instance.is_alive():
+                    if instance.process is not None:
+                        print_warning("Экземпляр LibreOffice завершился аварийно, перезапуск")
+                    instance.restart()
+
+                try:
+                    instance.convert(source, output_path)
+                    return
+                except Exception as e:
+                    # Ошибка при живом процессе - проблема документа, повтор не поможет
+                    crashed = not instance.is_alive() or type(e).__name__ == 'DisposedException'
+                    if not crashed or attempt == self.retries:
+                        raise
+                    instance.stop()
+        finally:
+            self._idle.put(instance)
+
+    def close(self):
+        """Остановка всех экземпляров пула"""
+        for instance in self._instances:
+            instance.stop()
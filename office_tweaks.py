@@ -10,12 +10,10 @@ from pathlib import Path
 # Добавляем текущую директорию в путь для импорта модулей
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from utils import setup_logging, print_success, print_error, print_info, print_banner
-from file_manager import FileManager
-from converter import DocumentConverter
-from image_processor import ImageProcessor
+# Подсистемы (обработка документов и изображений, меню) импортируются при первом
+# использовании: --help и операции с файлами не загружают Pillow, numpy и т.п.
+from utils import setup_logging, set_quiet, print_success, print_error, print_warning, print_info, print_banner
 from cli_parser import CLIParser
-from interactive_menu import InteractiveMenu
 import logging
 
 
@@ -28,38 +26,96 @@ class OfficeTweaks:
         self.image_processor = None
         self.cli_parser = CLIParser()
 
-        logging.info(f"Office_Tweaks v{self.version} запущен")
-
     def run_batch_mode(self, args):
         """Запуск пакетного режима"""
         print_banner(self.version)
         print_info("Пакетный режим обработки\n")
 
         # Инициализация менеджера файлов
+        from file_manager import FileManager
         workdir = args.workdir if args.workdir else None
-        self.file_manager = FileManager(workdir)
+        self.file_manager = FileManager(workdir, use_cache=not args.no_cache,
+                                        recursive=args.recursive, output_root=args.output_dir,
+                                        use_journal=True)
+        self.file_manager.resume_job = args.resume
+        if args.metrics_log or args.report or args.prometheus:
+            from run_metrics import RunMetrics
+            self.file_manager.metrics = RunMetrics(args.metrics_log, args.report, args.prometheus)
 
         print_info(f"Рабочий каталог: {self.file_manager.get_current_directory()}")
 
-        # Инициализация обработчиков
-        self.converter = DocumentConverter(self.file_manager)
-        self.image_processor = ImageProcessor(self.file_manager)
+        # Инициализация обработчиков, нужных для выбранной операции
+        if args.pdf2docx or args.docx2pdf:
+            from converter import DocumentConverter
+            self.converter = DocumentConverter(
+                self.file_manager,
+                large_pdf_pages=args.large_pdf_pages,
+                shard_pages=args.shard_pages,
+                docx_backend=args.docx_backend,
+                office_workers=args.office_workers
+            )
+        elif args.compress_images or args.watch:
+            from image_processor import ImageProcessor
+            self.image_processor = ImageProcessor(
+                self.file_manager,
+                target_size=args.target_size,
+                min_similarity=args.min_similarity,
+                max_width=args.max_width,
+                max_height=args.max_height,
+                resample=args.resample,
+                output_format=args.output_format,
+                min_savings=args.min_savings,
+                in_place=args.in_place,
+                adaptive_min_quality=args.adaptive_min_quality,
+                dedup=args.dedup,
+                dedup_distance=args.dedup_distance
+            )
 
-        # Обработка операций
-        if args.pdf2docx:
-            self._handle_pdf2docx(args)
-        elif args.docx2pdf:
-            self._handle_docx2pdf(args)
-        elif args.compress_images:
-            self._handle_compress_images(args)
-        elif args.delete:
-            self._handle_delete(args)
+        profiler = None
+        if args.profile:
+            from profiling import Profiler
+            if args.jobs != 1:
+                print_warning("Профилируется только главный процесс; для профиля обработки используйте --jobs 1")
+            profiler = Profiler(args.profile, args.profile_output)
+            profiler.start()
+
+        try:
+            # Обработка операций
+            if args.pdf2docx:
+                self._handle_pdf2docx(args)
+            elif args.docx2pdf:
+                self._handle_docx2pdf(args)
+            elif args.compress_images:
+                self._handle_compress_images(args)
+            elif args.delete:
+                self._handle_delete(args)
+            elif args.undo:
+                self.file_manager.undo_quarantine(args.undo, args.delete_dir)
+            elif args.purge_quarantine:
+                self.file_manager.purge_quarantine(args.retention_days, args.delete_dir)
+            elif args.find_duplicates:
+                print_info("Поиск дубликатов...")
+                self.file_manager.find_duplicate_files(args.dup_action, min_size=args.min_size or 1,
+                                                       quarantine=args.quarantine, confirm=not args.yes)
+
+            if args.watch:
+                self._handle_watch(args)
+        finally:
+            # Отчеты пишутся и при прерывании (в т.ч. при выходе из наблюдения по Ctrl+C)
+            if profiler:
+                report, written = profiler.stop()
+                print(report)
+                for path in written:
+                    print_info(f"Профиль записан: {path}")
+            if self.file_manager.metrics:
+                for path in self.file_manager.metrics.close():
+                    print_info(f"Метрики записаны: {path}")
 
     def _handle_pdf2docx(self, args):
         """Обработка конвертации PDF в DOCX"""
         if args.pdf2docx.lower() == 'all':
             print_info("Конвертация всех PDF файлов в DOCX...")
-            success, total = self.converter.convert_all_pdf_to_docx(args.workdir)
+            success, total = self.converter.convert_all_pdf_to_docx(args.workdir, args.jobs)
             if success > 0:
                 print_success(f"Успешно сконвертировано {success} из {total} файлов")
         else:
@@ -72,7 +128,7 @@ class OfficeTweaks:
         """Обработка конвертации DOCX в PDF"""
         if args.docx2pdf.lower() == 'all':
             print_info("Конвертация всех DOCX файлов в PDF...")
-            success, total = self.converter.convert_all_docx_to_pdf(args.workdir)
+            success, total = self.converter.convert_all_docx_to_pdf(args.workdir, args.jobs)
             if success > 0:
                 print_success(f"Успешно сконвертировано {success} из {total} файлов")
         else:
@@ -90,7 +146,7 @@ class OfficeTweaks:
         if args.compress_images.lower() == 'all':
             print_info(f"Сжатие всех изображений (качество: {args.quality}%)...")
             success, total, savings, original = self.image_processor.compress_all_images(
-                args.workdir, args.quality
+                args.workdir, args.quality, jobs=args.jobs
             )
             if success > 0:
                 print_success(f"Успешно сжато {success} из {total} изображений")
@@ -102,6 +158,33 @@ class OfficeTweaks:
             if success:
                 print_success("Сжатие завершено успешно")
 
+    def _handle_watch(self, args):
+        """Наблюдение за каталогом и обработка новых/измененных файлов"""
+        from folder_watcher import FolderWatcher
+        from file_manager import IMAGE_EXTENSIONS
+
+        ignore = None
+        if args.pdf2docx:
+            extensions = ['pdf']
+            handler = lambda files: self.converter.convert_all_pdf_to_docx(jobs=args.jobs, files=files)
+        elif args.docx2pdf:
+            extensions = ['docx']
+            handler = lambda files: self.converter.convert_all_docx_to_pdf(jobs=args.jobs, files=files)
+        else:
+            if not self.image_processor.pillow_available:
+                return
+            extensions = IMAGE_EXTENSIONS
+            # Результаты сжатия (в т.ч. замененные на месте) помечены - не обрабатываем их повторно
+            from image_processor import is_own_output
+            ignore = is_own_output
+            handler = lambda files: self.image_processor.compress_all_images(quality=args.quality, files=files,
+                                                                             jobs=args.jobs)
+
+        # Повторные пакеты наблюдения не журналируются: файл обработается при следующем изменении
+        self.file_manager.use_journal = False
+        watcher = FolderWatcher(self.file_manager, extensions, settle_time=args.settle_time, ignore=ignore)
+        watcher.watch(handler)
+
     def _handle_delete(self, args):
         """Обработка удаления файлов"""
         delete_dir = args.delete_dir if args.delete_dir else args.workdir
@@ -111,29 +194,47 @@ class OfficeTweaks:
         print_info(f"Удаление файлов в каталоге: {delete_dir}")
         print_info(f"Режим: {args.delete_mode}, Шаблон: {args.delete_pattern}")
 
+        filters = dict(recursive=args.recursive, older_than=args.older_than,
+                       min_size=args.min_size, max_size=args.max_size)
+
+        if args.quarantine:
+            # Пакеты старше срока хранения удаляются перед созданием нового
+            self.file_manager.purge_quarantine(args.retention_days, delete_dir)
+
+        if args.yes:
+            # Без подтверждения файлы удаляются по мере обхода, без построения списка
+            if not Path(delete_dir).is_dir():
+                print_error(f"Каталог '{delete_dir}' не существует")
+                return
+            self.file_manager.execute_deletion(self.file_manager.iter_files_to_delete(
+                args.delete_mode, args.delete_pattern, delete_dir, **filters), quarantine=args.quarantine,
+                directory=delete_dir)
+            return
+
         files_to_delete = self.file_manager.delete_files_by_pattern(
-            args.delete_mode, args.delete_pattern, delete_dir
+            args.delete_mode, args.delete_pattern, delete_dir, **filters
         )
 
         if files_to_delete:
             print_info(f"Найдено файлов для удаления: {len(files_to_delete)}")
-            for i, file_path in enumerate(files_to_delete, 1):
-                size = self.file_manager.get_file_size(file_path)
-                print(f"  {i}. {file_path.name} ({size})")
+            self.file_manager.print_deletion_preview(files_to_delete, delete_dir)
 
             from utils import confirm_action
             if confirm_action("Вы уверены, что хотите удалить эти файлы?"):
-                deleted_count = self.file_manager.execute_deletion(files_to_delete)
-                print_success(f"Удалено файлов: {deleted_count}/{len(files_to_delete)}")
+                self.file_manager.execute_deletion(files_to_delete, quarantine=args.quarantine,
+                                                   directory=delete_dir)
             else:
                 print_info("Удаление отменено")
-        else:
-            print_info("Файлы, соответствующие критерию, не найдены")
 
     def run_interactive_mode(self):
         """Запуск интерактивного режима"""
         # Инициализация компонентов
-        self.file_manager = FileManager()
+        from file_manager import FileManager
+        from converter import DocumentConverter
+        from image_processor import ImageProcessor
+        from interactive_menu import InteractiveMenu
+
+        self.file_manager = FileManager(use_cache=True)
         self.converter = DocumentConverter(self.file_manager)
         self.image_processor = ImageProcessor(self.file_manager)
 
@@ -146,6 +247,9 @@ class OfficeTweaks:
         try:
             # Парсинг аргументов
             args = self.cli_parser.parse_args()
+            # Тихий режим включается до первой записи в журнал: она выводится и на консоль
+            set_quiet(args.quiet)
+            logging.info(f"Office_Tweaks v{self.version} запущен")
 
             # Определение режима работы
             mode = self.cli_parser.get_operation_mode(args)
@@ -174,4 +278,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # Необходимо для пула процессов в собранном PyInstaller exe (Windows)
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
     main()
\ No newline at end of file
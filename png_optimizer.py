@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+# Параметры zlib: стратегии (Z_DEFAULT_STRATEGY, Z_FILTERED, Z_RLE) перебираются
+# на быстром уровне, максимальный уровень пробуется один раз для лучшей пары
+ZLIB_FAST_LEVEL = 6
+ZLIB_MAX_LEVEL = 9
+ZLIB_STRATEGIES = (0, 1, 3)
+
+# Большие изображения: представления сравниваются на уровне 1 только со
+# стратегией по умолчанию (уровень 9 для 12 Мп занимает несколько секунд)
+LARGE_IMAGE_PIXELS = 2_000_000
+LARGE_IMAGE_LEVEL = 1
+
+# Режимы, для которых строятся упрощенные представления
+REDUCIBLE_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def png_bit_depth(path):
+    """Бит на отсчет из заголовка IHDR (None, если файл не PNG)
+
+    Pillow открывает 16-битные RGB и RGBA как 8-битные, поэтому глубина
+    исходного файла читается из заголовка.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(25)
+    if len(header) < 25 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        return None
+    return header[24]
+
+
+def _reduce_channels(img):
+    """Удаление лишних каналов без потерь
+
+    Полностью непрозрачный альфа-канал отбрасывается, изображение с
+    одинаковыми R, G и B переводится в оттенки серого.
+    """
+    from PIL import ImageChops
+
+    if img.mode in ('RGBA', 'LA') and img.getchannel('A').getextrema() == (255, 255):
+        img = img.convert('RGB' if img.mode == 'RGBA' else 'L')
+
+    if img.mode in ('RGB', 'RGBA'):
+        red, green, blue = img.getchannel('R'), img.getchannel('G'), img.getchannel('B')
+        if ImageChops.difference(red, green).getbbox() is None and \
+                ImageChops.difference(green, blue).getbbox() is None:
+            img = img.convert('LA' if img.mode == 'RGBA' else 'L')
+    return img
+
+
+def _exact_palette(img):
+    """Палитровое представление без потерь (None если цветов больше 256)
+
+    Палитра содержит только используемые цвета, поэтому при 16 цветах и
+    меньше Pillow сохраняет PNG с глубиной 4, 2 или 1 бит. Прозрачные
+    цвета ставятся в начало палитры, чтобы блок tRNS был короче.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rgba = img.convert('RGBA')
+    if rgba.getcolors(256) is None:
+        return None
+
+    packed = np.ascontiguousarray(np.asarray(rgba)).view(np.uint32).ravel()
+    colors, indices = np.unique(packed, return_inverse=True)
+    entries = colors.view(np.uint8).reshape(-1, 4)
+
+    order = np.argsort(entries[:, 3], kind='stable')
+    entries = entries[order]
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+
+    palette_img = Image.frombytes('P', img.size, remap[indices].astype(np.uint8).tobytes())
+    palette_img.putpalette(entries[:, :3].tobytes())
+    alpha = entries[:, 3]
+    if alpha.min() < 255:
+        palette_img.info['transparency'] = alpha[:int(np.nonzero(alpha < 255)[0].max()) + 1].tobytes()
+    return palette_img
+
+
+def _encode(img, level, strategy, save_kwargs):
+    buffer = BytesIO()
+    img.save(buffer, format='PNG', compress_level=level, compress_type=strategy, **save_kwargs)
+    return buffer.getvalue()
+
+
+def _pixels(data_or_img):
+    """Пиксели изображения в RGBA для проверки идентичности"""
+    from PIL import Image
+
+    if isinstance(data_or_img, bytes):
+        with Image.open(BytesIO(data_or_img)) as img:
+            return img.convert('RGBA').tobytes()
+    return data_or_img.convert('RGBA').tobytes()
+
+
+def optimize_png(img, workers=None, text=None):
+    """Сжатие PNG без потерь: (данные, число попыток кодирования)
+
+    Кодируются исходное представление, представление с уменьшенным числом
+    каналов и точная палитра; для каждого перебираются стратегии zlib на
+    уровне 6 (в потоках - кодирование zlib не держит GIL), затем лучшая
+    пара кодируется на уровне 9. Метаданные, кроме ICC-профиля и текстовых
+    полей text, не сохраняются. Выбирается наименьший результат, пиксели
+    которого совпадают с исходными.
+    """
+    save_kwargs = {}
+    if img.info.get('icc_profile'):
+        save_kwargs['icc_profile'] = img.info['icc_profile']
+    if text:
+        from PIL.PngImagePlugin import PngInfo
+
+        save_kwargs['pnginfo'] = PngInfo()
+        for key, value in text.items():
+            save_kwargs['pnginfo'].add_text(key, value)
+
+    variants = [img]
+    if img.mode in REDUCIBLE_MODES:
+        reduced = _reduce_channels(img)
+        if reduced is not img:
+            variants.append(reduced)
+        palette_img = _exact_palette(img)
+        if palette_img is not None:
+            variants.append(palette_img)
+
+    level, strategies = ZLIB_FAST_LEVEL, ZLIB_STRATEGIES
+    if img.width * img.height > LARGE_IMAGE_PIXELS:
+        level, strategies = LARGE_IMAGE_LEVEL, ZLIB_STRATEGIES[:1]
+    tasks = [(variant, level, strategy) for variant in variants for strategy in strategies]
+    workers = min(len(tasks), workers or os.cpu_count() or 1)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda task: _encode(*task, save_kwargs), tasks))
+    else:
+        results = [_encode(*task, save_kwargs) for task in tasks]
+
+    # Уровень 9 пробуется только для лучшей пары и остается, если он меньше
+    best = min(range(len(tasks)), key=lambda i: len(results[i]))
+    variant, _, strategy = tasks[best]
+    results.append(_encode(variant, ZLIB_MAX_LEVEL, strategy, save_kwargs))
+    trials = len(results)
+
+    reference = _pixels(img)
+    for data in sorted(results, key=len):
+        if _pixels(data) == reference:
+            return data, trials
+
+    # Ни один вариант не прошел проверку - сохраняем как есть
+    return _encode(img, ZLIB_MAX_LEVEL, 0, save_kwargs), trials + 1
@@ -0,0 +1,176 @@
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Интервал опроса стеков в режиме sample (секунд)
+SAMPLE_INTERVAL = 0.005
+# Сколько строк выводить в отчетах
+TOP_ENTRIES = 20
+
+# Активный профилировщик (None - профилирование выключено)
+_profiler = None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """Профилирование пакетного запуска
+
+    cpu - cProfile, результат сохраняется в .pstats (просмотр: python -m pstats,
+    snakeviz); sample - опрос стеков всех потоков раз в SAMPLE_INTERVAL секунд,
+    результат - свернутые стеки (.collapsed) для flamegraph.pl, speedscope;
+    mem - tracemalloc: места наибольших выделений памяти и пиковая память
+    на каждый файл. Во всех режимах собирается время разделов, отмеченных
+    декоратором profiled. Профилируется только главный процесс: при --jobs > 1
+    работа пула процессов в профиль не попадает.
+    """
+
+    def __init__(self, mode, output_prefix):
+        self.mode = mode
+        self.output_prefix = f"{output_prefix}-{mode}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.owner_pid = os.getpid()
+        # Раздел -> [вызовов, секунд всего, секунд максимум]
+        self.sections = {}
+        # (пиковая память, раздел, файл)
+        self.peaks = []
+        self._lock = threading.Lock()
+        self._profile = None
+        self._samples = {}
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        global _profiler
+        if self.mode == 'cpu':
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+        elif self.mode == 'mem':
+            import tracemalloc
+            tracemalloc.start(10)
+        _profiler = self
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+                self._samples[key] = self._samples.get(key, 0) + 1
+
+    @contextmanager
+    def section(self, name, target=None):
+        """Замер раздела; в режиме mem с target - пиковая память обработки файла"""
+        track_peak = self.mode == 'mem' and target is not None
+        if track_peak:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self.sections.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                if track_peak:
+                    self.peaks.append((tracemalloc.get_traced_memory()[1], name, str(target)))
+
+    def stop(self):
+        """Остановить профилирование и записать результаты; (отчет, записанные файлы)"""
+        global _profiler
+        _profiler = None
+        written = []
+        lines = []
+
+        if self.mode == 'cpu':
+            import io
+            import pstats
+            self._profile.disable()
+            path = f"{self.output_prefix}.pstats"
+            self._profile.dump_stats(path)
+            written.append(path)
+            buffer = io.StringIO()
+            pstats.Stats(self._profile, stream=buffer).sort_stats('cumulative').print_stats(TOP_ENTRIES)
+            lines.append(buffer.getvalue().strip())
+        elif self.mode == 'sample':
+            self._stopped.set()
+            self._sampler.join()
+            path = f"{self.output_prefix}.collapsed"
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self._samples.items()):
+                    f.write(f"{stack} {count}\n")
+            written.append(path)
+            # Функции с наибольшим собственным временем (верхний кадр стека)
+            own = {}
+            total = sum(self._samples.values()) or 1
+            for stack, count in self._samples.items():
+                leaf = stack.rsplit(';', 1)[-1]
+                own[leaf] = own.get(leaf, 0) + count
+            lines.append(f"Выборок: {total}. Собственное время:")
+            lines.extend(f"  {count / total * 100:5.1f}%  {leaf}"
+                         for leaf, count in sorted(own.items(), key=lambda item: -item[1])[:TOP_ENTRIES])
+        elif self.mode == 'mem':
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines.append(f"Память: сейчас {current / 1024 / 1024:.1f} МБ, пик (после последнего файла) "
+                         f"{peak / 1024 / 1024:.1f} МБ")
+            lines.append("Места наибольших выделений:")
+            for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]:
+                frame = stat.traceback[0]
+                lines.append(f"  {stat.size / 1024:10.1f} КБ  {stat.count:8d}  {frame.filename}:{frame.lineno}")
+            if self.peaks:
+                lines.append("Пиковая память при обработке файла:")
+                for peak_bytes, name, target in sorted(self.peaks, reverse=True)[:TOP_ENTRIES]:
+                    lines.append(f"  {peak_bytes / 1024 / 1024:8.1f} МБ  {name}  {target}")
+
+        if self.sections:
+            lines.append("Разделы (вызовов, всего с, максимум с):")
+            for name, (count, total_seconds, max_seconds) in sorted(self.sections.items(),
+                                                                    key=lambda item: -item[1][1]):
+                lines.append(f"  {name}: {count}, {total_seconds:.3f}, {max_seconds:.3f}")
+
+        report = '\n'.join(lines)
+        path = f"{self.output_prefix}.txt"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+        written.append(path)
+        return report, written
+
+
+def profiled(name, per_file=False):
+    """Декоратор раздела для профилирования
+
+    per_file - первый аргумент функции (после self) - обрабатываемый файл;
+    в режиме mem для него запоминается пиковая память.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            # В дочерних процессах пула (fork) профилировщик родителя не используется
+            if profiler is None or profiler.owner_pid != os.getpid():
+                return function(*args, **kwargs)
+            target = args[1] if per_file and len(args) > 1 else None
+            with profiler.section(name, target):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
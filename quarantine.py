@@ -0,0 +1,186 @@
+import errno
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+QUARANTINE_DIRNAME = '.office_tweaks_quarantine'
+MANIFEST_NAME = 'manifest.jsonl'
+
+# Срок хранения пакетов в карантине по умолчанию (дней)
+RETENTION_DAYS = 30
+# Манифест сбрасывается на диск (fsync) после каждых MANIFEST_SYNC_INTERVAL записей
+MANIFEST_SYNC_INTERVAL = 100
+
+
+class QuarantineBatch:
+    """Пакет файлов, перемещенных в карантин вместо удаления
+
+    Файлы переносятся переименованием (без копирования данных) в каталог
+    пакета. Манифест - JSON строки, только дозапись: заголовок пакета,
+    далее пары исходный путь - путь в карантине. Запись о файле попадает в
+    манифест до переноса, поэтому после аварийного завершения --undo
+    восстановит все перенесенные файлы; записи о файлах, которые не были
+    перенесены, при восстановлении пропускаются.
+    """
+
+    def __init__(self, path, batch_id):
+        self.path = Path(path)
+        self.batch_id = batch_id
+        self.moved = 0
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._unsynced = 0
+        self._manifest = open(self.path / MANIFEST_NAME, 'a', encoding='utf-8')
+
+    @staticmethod
+    def quarantine_dir(directory):
+        """Каталог карантина"""
+        return Path(directory) / QUARANTINE_DIRNAME
+
+    @classmethod
+    def create(cls, directory):
+        """Новый пакет карантина"""
+        batch_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        path = cls.quarantine_dir(directory) / batch_id
+        path.mkdir(parents=True)
+        batch = cls(path, batch_id)
+        with batch._lock:
+            batch._append({'batch': batch_id, 'created': time.time()})
+        return batch
+
+    @classmethod
+    def list_batches(cls, directory):
+        """Идентификаторы пакетов в карантине"""
+        quarantine_dir = cls.quarantine_dir(directory)
+        if not quarantine_dir.is_dir():
+            return []
+        return sorted(p.name for p in quarantine_dir.iterdir() if (p / MANIFEST_NAME).is_file())
+
+    def _append(self, record):
+        """Дописать запись в манифест (вызывается под self._lock)
+
+        Запись сразу передается ОС (переживает падение процесса), fsync
+        делается раз в MANIFEST_SYNC_INTERVAL записей.
+        """
+        self._manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._manifest.flush()
+        self._unsynced += 1
+        if self._unsynced >= MANIFEST_SYNC_INTERVAL:
+            os.fsync(self._manifest.fileno())
+            self._unsynced = 0
+
+    def move(self, file_path):
+        """Перенести файл в карантин (OSError при ошибке)"""
+        source = Path(file_path).resolve()
+        with self._lock:
+            self._counter += 1
+            target = self.path / f"{self._counter:06d}_{source.name}"
+            self._append({'src': str(source), 'dst': target.name})
+
+        try:
+            os.rename(source, target)
+        except OSError as e:
+            # Файл на другой файловой системе переносится копированием
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(source), str(target))
+
+        with self._lock:
+            self.moved += 1
+
+    def close(self):
+        """Сбросить манифест на диск; пустой пакет удаляется"""
+        if self._manifest.closed:
+            return
+        self._manifest.flush()
+        os.fsync(self._manifest.fileno())
+        self._manifest.close()
+        if not self.moved:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _read_manifest(batch_path):
+    """(заголовок, [(исходный путь, имя в карантине)]); оборванные строки пропускаются"""
+    header = None
+    entries = []
+    with open(batch_path / MANIFEST_NAME, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if header is None:
+                header = record
+            elif 'src' in record:
+                entries.append((record['src'], record['dst']))
+    return header or {}, entries
+
+
+def restore_batch(directory, batch_id):
+    """Вернуть файлы пакета на исходные места: (восстановлено, [(путь, ошибка)])
+
+    Существующие файлы не перезаписываются. Если восстановлены все файлы,
+    пакет удаляется, иначе в манифесте остаются невосстановленные.
+    """
+    batch_path = QuarantineBatch.quarantine_dir(directory) / batch_id
+    header, entries = _read_manifest(batch_path)
+
+    restored = 0
+    remaining = []
+    errors = []
+    for source, name in entries:
+        target = batch_path / name
+        if not target.exists():
+            continue
+        try:
+            if os.path.lexists(source):
+                raise FileExistsError(errno.EEXIST, "Файл уже существует")
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            try:
+                os.rename(target, source)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(str(target), source)
+            restored += 1
+        except OSError as e:
+            remaining.append((source, name))
+            errors.append((source, e))
+
+    if remaining:
+        tmp_path = batch_path / f".{MANIFEST_NAME}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for source, name in remaining:
+                f.write(json.dumps({'src': source, 'dst': name}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, batch_path / MANIFEST_NAME)
+    else:
+        shutil.rmtree(batch_path)
+    return restored, errors
+
+
+def purge_expired(directory, retention_days=RETENTION_DAYS):
+    """Удалить пакеты старше retention_days дней: (пакетов, файлов)"""
+    deadline = time.time() - retention_days * 86400
+    purged_batches = 0
+    purged_files = 0
+    for batch_id in QuarantineBatch.list_batches(directory):
+        batch_path = QuarantineBatch.quarantine_dir(directory) / batch_id
+        try:
+            header, entries = _read_manifest(batch_path)
+            created = header.get('created') or (batch_path / MANIFEST_NAME).stat().st_mtime
+        except OSError:
+            continue
+        if created > deadline:
+            continue
+        purged_batches += 1
+        # Записи о файлах, которые не были перенесены, не считаются
+        purged_files += sum(1 for _, name in entries if (batch_path / name).exists())
+        shutil.rmtree(batch_path, ignore_errors=True)
+    return purged_batches, purged_files
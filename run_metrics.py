@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from utils import atomic_output
+
+# Состояния файла в событиях
+STATUS_OK = 'ok'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_CACHED = 'cached'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_FAILED = 'failed'
+
+METRIC_PREFIX = 'office_tweaks'
+
+
+class RunMetrics:
+    """Метрики запуска: события по файлам (JSON строки) и итоговый отчет
+
+    Каждый обработанный файл - одна запись: операция, файлы, объем входа
+    и результата, время этапов (decode, encode, convert, total), механизм
+    обработки, качество сжатия и ошибка. Итоги по операциям накапливаются в памяти и
+    записываются в конце запуска в JSON и в текстовом формате Prometheus
+    (для textfile collector node exporter).
+    """
+
+    def __init__(self, events_path=None, report_path=None, prometheus_path=None):
+        self.events_path = Path(events_path) if events_path else None
+        self.report_path = Path(report_path) if report_path else None
+        self.prometheus_path = Path(prometheus_path) if prometheus_path else None
+        self.started = time.time()
+        self._started_monotonic = time.monotonic()
+        self._lock = threading.Lock()
+        # Операция -> итоги
+        self._totals = {}
+        self._events = open(self.events_path, 'a', encoding='utf-8') if self.events_path else None
+
+    def record(self, operation, source, status, output=None, input_bytes=0, output_bytes=0,
+               timings=None, backend=None, error=None, quality=None):
+        """Записать событие обработки файла"""
+        timings = {stage: round(seconds, 6) for stage, seconds in (timings or {}).items()}
+        event = {
+            'time': round(time.time(), 3),
+            'operation': operation,
+            'file': str(source),
+            'status': status,
+            'output': str(output) if output else None,
+            'input_bytes': input_bytes,
+            'output_bytes': output_bytes,
+            'timings': timings,
+            'backend': backend,
+            'quality': quality,
+            'error': error,
+        }
+
+        with self._lock:
+            totals = self._totals.setdefault(operation, {
+                'files': {}, 'input_bytes': 0, 'output_bytes': 0, 'seconds': {}})
+            totals['files'][status] = totals['files'].get(status, 0) + 1
+            totals['input_bytes'] += input_bytes
+            totals['output_bytes'] += output_bytes
+            for stage, seconds in timings.items():
+                totals['seconds'][stage] = totals['seconds'].get(stage, 0.0) + seconds
+            if self._events:
+                self._events.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def summary(self):
+        """Итоги запуска"""
+        duration = time.monotonic() - self._started_monotonic
+        with self._lock:
+            operations = json.loads(json.dumps(self._totals))
+        for totals in operations.values():
+            totals['seconds'] = {stage: round(seconds, 6) for stage, seconds in totals['seconds'].items()}
+            processed = sum(totals['files'].values())
+            totals['files_per_second'] = round(processed / duration, 3) if duration else 0.0
+            totals['input_bytes_per_second'] = round(totals['input_bytes'] / duration, 1) if duration else 0.0
+        return {
+            'started': round(self.started, 3),
+            'duration_seconds': round(duration, 3),
+            'operations': operations,
+        }
+
+    def prometheus_text(self, summary):
+        """Итоги в текстовом формате Prometheus"""
+        metrics = [
+            ('files_total', 'counter', 'Обработано файлов'),
+            ('input_bytes_total', 'counter', 'Объем входных файлов, байт'),
+            ('output_bytes_total', 'counter', 'Объем результатов, байт'),
+            ('stage_seconds_total', 'counter', 'Время этапов обработки, секунд'),
+        ]
+        samples = {name: [] for name, _, _ in metrics}
+        for operation, totals in sorted(summary['operations'].items()):
+            for status, count in sorted(totals['files'].items()):
+                samples['files_total'].append((f'operation="{operation}",status="{status}"', count))
+            samples['input_bytes_total'].append((f'operation="{operation}"', totals['input_bytes']))
+            samples['output_bytes_total'].append((f'operation="{operation}"', totals['output_bytes']))
+            for stage, seconds in sorted(totals['seconds'].items()):
+                samples['stage_seconds_total'].append((f'operation="{operation}",stage="{stage}"', seconds))
+
+        lines = []
+        for name, metric_type, description in metrics:
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {description}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+            lines.extend(f"{METRIC_PREFIX}_{name}{{{labels}}} {value}" for labels, value in samples[name])
+        lines.append(f"# HELP {METRIC_PREFIX}_run_duration_seconds Длительность запуска, секунд")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_duration_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_run_duration_seconds {summary['duration_seconds']}")
+        lines.append(f"# HELP {METRIC_PREFIX}_run_started_seconds Время начала запуска (Unix)")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_started_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_run_started_seconds {summary['started']}")
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        """Закрыть журнал событий и записать отчеты; список записанных файлов"""
+        written = []
+        if self._events:
+            self._events.close()
+            self._events = None
+            written.append(self.events_path)
+
+        summary = self.summary()
+        # Отчеты записываются атомарно: сборщик метрик не прочитает недописанный файл
+        if self.report_path:
+            with atomic_output(self.report_path) as tmp_path:
+                tmp_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+            written.append(self.report_path)
+        if self.prometheus_path:
+            # Временный файл без расширения .prom, чтобы его не прочитал textfile collector
+            tmp_path = self.prometheus_path.with_name(f".{self.prometheus_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(self.prometheus_text(summary), encoding='utf-8')
+            os.replace(tmp_path, self.prometheus_path)
+            written.append(self.prometheus_path)
+        return written
+
+
+def file_size(path):
+    """Размер файла (0 если файл недоступен)"""
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
@@ -1,12 +1,26 @@
+import io
 import os
 import sys
 import logging
+import threading
 import time
+from contextlib import contextmanager, redirect_stdout
 from pathlib import Path
-from colorama import init, Fore, Style
 
-# Инициализация colorama для кроссплатформенной работы с цветами
-init(autoreset=True)
+# Строка прогресса перерисовывается не чаще раза в PROGRESS_REDRAW_INTERVAL секунд;
+# если вывод не в терминал - печатается строкой раз в PROGRESS_LOG_INTERVAL секунд
+PROGRESS_REDRAW_INTERVAL = 0.1
+PROGRESS_LOG_INTERVAL = 5.0
+
+# Прогресс, через который сейчас выводятся сообщения (None - выводятся напрямую)
+_active_progress = None
+# Тихий режим: выводятся только ошибки и предупреждения
+_quiet = False
+# Цвета colorama (Fore, Style); colorama импортируется при первом выводе
+_colors = None
+
+# Очистка экрана: курсор в начало и стирание экрана (без запуска cls/clear)
+CLEAR_SCREEN = '\033[H\033[2J'
 
 
 def setup_logging():
@@ -21,34 +35,84 @@ def setup_logging():
     )
 
 
+def _init_colors():
+    """Цвета для вывода; при первом вызове инициализируется colorama
+
+    На Windows colorama оборачивает sys.stdout и переводит ANSI-последовательности
+    (цвета и очистку экрана) в вызовы консоли.
+    """
+    global _colors
+    if _colors is None:
+        from colorama import init, Fore, Style
+        init(autoreset=True)
+        _colors = Fore, Style
+    return _colors
+
+
+def set_quiet(quiet):
+    """Включить тихий режим (без информационных сообщений и прогресса)"""
+    global _quiet
+    _quiet = quiet
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+            handler.setLevel(logging.WARNING if quiet else logging.NOTSET)
+
+
+def _emit(text):
+    """Вывод строки: через активный прогресс (если он есть) или напрямую"""
+    progress = _active_progress
+    if progress is not None and progress.owner_pid == os.getpid():
+        progress.write(text)
+    else:
+        print(text)
+
+
 def print_success(message):
     """Вывод успешного сообщения"""
-    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+    if _quiet:
+        return
+    Fore, Style = _init_colors()
+    _emit(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
 
 
 def print_error(message):
     """Вывод сообщения об ошибке"""
-    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+    Fore, Style = _init_colors()
+    _emit(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
 
 
 def print_warning(message):
     """Вывод предупреждения"""
-    print(f"{Fore.YELLOW}⚠ {message}{Style.RESET_ALL}")
+    Fore, Style = _init_colors()
+    _emit(f"{Fore.YELLOW}⚠ {message}{Style.RESET_ALL}")
 
 
 def print_info(message):
     """Вывод информационного сообщения"""
-    print(f"{Fore.CYAN}ℹ {message}{Style.RESET_ALL}")
+    if _quiet:
+        return
+    Fore, Style = _init_colors()
+    _emit(f"{Fore.CYAN}ℹ {message}{Style.RESET_ALL}")
 
 
 def print_banner(version):
     """Вывод баннера программы"""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    if _quiet:
+        return
+    clear_screen()
     print(f"\n{'=' * 50}")
     print(f"=== Office Tweaks v{version} ===")
     print(f"{'=' * 50}")
 
 
+def clear_screen():
+    """Очистка экрана терминала (вывод не в терминал не очищается)"""
+    _init_colors()
+    if sys.stdout.isatty():
+        sys.stdout.write(CLEAR_SCREEN)
+        sys.stdout.flush()
+
+
 def validate_number_input(input_str, min_val, max_val):
     """Валидация числового ввода"""
     try:
@@ -98,25 +162,200 @@ def confirm_action(message):
             print_error("Пожалуйста, введите 'y' или 'n'")
 
 
-def show_progress(current, total, description="Обработка"):
-    """Простой прогресс-бар"""
-    percent = (current / total) * 100 if total > 0 else 100
-    bar_length = 30
-    filled_length = int(bar_length * current // total)
-    bar = '█' * filled_length + '░' * (bar_length - filled_length)
+def _format_duration(seconds):
+    """Длительность в виде Ч:ММ:СС"""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class Progress:
+    """Прогресс пакетной обработки: полоса, файлов/с, МБ/с и оставшееся время
+
+    Обновления и сообщения принимаются из любых потоков. Пока прогресс
+    активен (блок with), print_success/print_error/print_warning/print_info
+    не печатают сразу, а копят строки; фоновый поток выводит их вместе с
+    полосой раз в PROGRESS_REDRAW_INTERVAL секунд. Если вывод не в терминал,
+    вместо полосы раз в PROGRESS_LOG_INTERVAL секунд печатается строка
+    состояния. total=None - число файлов заранее неизвестно.
+    """
+
+    def __init__(self, total, description="Обработка", initial=0, stream=None):
+        self.total = total
+        self.description = description
+        self.count = initial
+        self.bytes = 0
+        # Поток берется после инициализации colorama (на Windows она подменяет sys.stdout)
+        _init_colors()
+        self.stream = stream or sys.stdout
+        self.is_tty = self.stream.isatty()
+        self.interval = PROGRESS_REDRAW_INTERVAL if self.is_tty else PROGRESS_LOG_INTERVAL
+        self.owner_pid = os.getpid()
+        self._initial = initial
+        self._lock = threading.Lock()
+        self._lines = []
+        self._bar_width = 0
+        self._started = time.monotonic()
+        self._last_draw = 0.0
+        self._stopped = threading.Event()
+        self._renderer = None
+
+    def __enter__(self):
+        global _active_progress
+        self._previous, _active_progress = _active_progress, self
+        self._renderer = threading.Thread(target=self._render_loop, daemon=True)
+        self._renderer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_progress
+        _active_progress = self._previous
+        self.close()
+
+    def update(self, count=1, nbytes=0):
+        """Учесть обработанные файлы (и их объем в байтах)"""
+        with self._lock:
+            self.count += count
+            self.bytes += nbytes
 
-    print(f"\r{description}: |{bar}| {current}/{total} ({percent:.1f}%)", end='', flush=True)
+    def write(self, text):
+        """Сообщение, выводимое над полосой прогресса"""
+        with self._lock:
+            self._lines.append(text)
 
-    if current == total:
-        print()
+    def _render_loop(self):
+        while not self._stopped.wait(PROGRESS_REDRAW_INTERVAL):
+            with self._lock:
+                now = time.monotonic()
+                self._flush(now, now - self._last_draw >= self.interval)
 
+    def close(self):
+        """Вывести накопленные сообщения и итоговое состояние"""
+        self._stopped.set()
+        if self._renderer is not None:
+            self._renderer.join()
+            self._renderer = None
+        with self._lock:
+            self._flush(time.monotonic(), True)
+            if self.is_tty and self._bar_width:
+                self.stream.write('\n')
+                self._bar_width = 0
+            self.stream.flush()
 
-def print_summary(success_count, total_count, total_savings=0, total_original_size=0):
+    def status(self):
+        """Строка состояния: счетчик, процент, скорость и оставшееся время"""
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        processed = self.count - self._initial
+        rate = processed / elapsed
+        parts = [f"{self.count}/{self.total} ({self.count / self.total * 100 if self.total else 100:.1f}%)"
+                 if self.total is not None else str(self.count),
+                 f"{rate:.1f} файл/с"]
+        if self.bytes:
+            parts.append(f"{self.bytes / elapsed / 1024 / 1024:.1f} МБ/с")
+        if self.total is not None and 0 < processed and self.count < self.total:
+            parts.append(f"осталось {_format_duration((self.total - self.count) / rate)}")
+        return ', '.join(parts)
+
+    def _flush(self, now, draw):
+        """Вывод накопленных строк и (если draw) состояния; вызывается под блокировкой"""
+        output = []
+        if self._lines:
+            if self._bar_width:
+                # Полоса стирается, сообщения печатаются на ее месте
+                output.append('\r' + ' ' * self._bar_width + '\r')
+                self._bar_width = 0
+            output.extend(line + '\n' for line in self._lines)
+            self._lines = []
+
+        if draw and not _quiet:
+            if self.is_tty:
+                line = f"{self.description}: "
+                if self.total:
+                    filled = min(30, 30 * self.count // self.total)
+                    line += f"|{'█' * filled}{'░' * (30 - filled)}| "
+                line += self.status()
+                output.append('\r' + line.ljust(self._bar_width))
+                self._bar_width = len(line)
+            else:
+                output.append(f"{self.description}: {self.status()}\n")
+            self._last_draw = now
+
+        if output:
+            self.stream.write(''.join(output))
+            self.stream.flush()
+
+
+@contextmanager
+def atomic_output(output_path):
+    """Временный путь для записи результата; файл переименовывается в output_path после успеха
+
+    Временный файл скрыт и лежит в том же каталоге (переименование атомарно),
+    расширение сохраняется. При ошибке временный файл удаляется, поэтому
+    после сбоя не остается недописанных файлов под итоговым именем.
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f".{output_path.stem}.{os.getpid()}.tmp{output_path.suffix}")
+    try:
+        yield tmp_path
+        with open(tmp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def resolve_jobs(jobs):
+    """Количество рабочих процессов (0 или None - по числу ядер)"""
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, int(jobs))
+
+
+def iter_parallel(worker, tasks, jobs, initializer=None, initargs=(), use_threads=False):
+    """Выполнение задач в пуле процессов (или потоков), результаты выдаются по мере готовности"""
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+    executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    with executor_class(max_workers=jobs, initializer=initializer, initargs=initargs) as executor:
+        if use_threads:
+            futures = {executor.submit(worker, task): task for task in tasks}
+        else:
+            # Вывод дочернего процесса возвращается вместе с результатом,
+            # чтобы не смешиваться с полосой прогресса
+            futures = {executor.submit(_call_captured, worker, task, _quiet): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+                if not use_threads:
+                    result, output = result
+                    if output:
+                        _emit(output.rstrip('\n'))
+            except Exception as e:
+                print_error(f"Ошибка в рабочем процессе: {str(e)}")
+                result = None
+            yield futures[future], result
+
+
+def _call_captured(worker, task, quiet=False):
+    """Выполнить задачу в дочернем процессе, перехватив ее вывод"""
+    set_quiet(quiet)
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        result = worker(task)
+    return result, buffer.getvalue()
+
+
+def print_summary(success_count, total_count, total_savings=0, total_original_size=0, cache_hits=0):
     """Вывод сводки обработки"""
+    if _quiet:
+        return
     print(f"\n{'=' * 50}")
     print("Сводка обработки:")
     print(f"  Успешно обработано: {success_count}/{total_count}")
 
+    if cache_hits:
+        print(f"  Пропущено без изменений (кэш): {cache_hits}")
+
     if success_count < total_count:
         print(f"  Не удалось обработать: {total_count - success_count}")
 